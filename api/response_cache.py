@@ -0,0 +1,90 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+
+    '''
+    In-process LRU cache of serialized responses with a size budget.
+
+    Every entry is stored together with validators (e.g. the mtimes of the
+    files it was built from). An entry is only returned while the current
+    validators are equal to the stored ones, so changed inputs invalidate it.
+    '''
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, validators):
+        """
+        Get a cached value.
+
+        Parameters
+        ----------
+        key : hashable
+            The cache key.
+        validators : tuple
+            The current validators of the inputs of the entry.
+
+        Returns
+        -------
+        object or None
+            The cached value, or None if missing or stale.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != validators:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, validators, value, size):
+        """
+        Store a value of the given size in bytes, evicting least recently used entries.
+        """
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (validators, value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self.size -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.size, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+def mtime_validators(*paths):
+    """
+    Get the mtimes of the given paths as cache validators, None for missing paths.
+    """
+    validators = []
+    for path in paths:
+        try:
+            validators.append(os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            validators.append(None)
+    return tuple(validators)
@@ -0,0 +1,172 @@
+import json
+import math
+
+import numpy as np
+
+import utils
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+JSON_MIMETYPE = 'application/json'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+
+def _default(obj):
+    """
+    Encode the values the JSON encoders do not handle natively, mapping NaN and inf to null.
+    """
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind == 'f':
+            return np.where(np.isfinite(obj), obj, None).tolist()
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        value = obj.item()
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        return value
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(data):
+    """
+    Serialize a response to JSON bytes in one pass.
+
+    NumPy arrays and scalars are encoded directly by orjson, which writes NaN
+    and inf as null, so no convert_float32 walk over the tree is needed. Without
+    orjson the standard library encoder is used after utils.convert_float32.
+
+    Returns
+    -------
+    bytes
+        The UTF-8 encoded JSON document.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(utils.convert_float32(data), default=_default).encode()
+
+
+def binary_mimetypes():
+    """
+    Get the binary response mimetypes whose encoder is installed in this environment.
+    """
+    mimetypes = []
+    if pa is not None:
+        mimetypes.append(ARROW_MIMETYPE)
+    if msgpack is not None:
+        mimetypes.append(MSGPACK_MIMETYPE)
+    return mimetypes
+
+
+def negotiate(accept_mimetypes, offered=(JSON_MIMETYPE,)):
+    """
+    Select the response mimetype of a request from its Accept header.
+
+    Parameters
+    ----------
+    accept_mimetypes : werkzeug.datastructures.MIMEAccept
+        The parsed Accept header of the request.
+    offered : tuple
+        The text mimetypes the route can produce, preferred first. The installed
+        binary formats are offered after them.
+
+    Returns
+    -------
+    str or None
+        The best matching mimetype, or None if the client accepts none of the
+        offered ones (e.g. asks for Arrow while pyarrow is not installed).
+    """
+    if not accept_mimetypes:
+        return offered[0]
+    return accept_mimetypes.best_match(list(offered) + binary_mimetypes())
+
+
+def timeseries_columns(timeseries_with_stats):
+    """
+    Split a timeseries object into typed columns and the remaining stats.
+
+    The dates become int64 epoch milliseconds and all other series float32
+    arrays. Per-date ranges of the stats (e.g. stats['idr_full']['min'], a list
+    or numpy array with one value per date) become columns named
+    '<key>_min'/'<key>_max'; their means stay in the stats.
+
+    Returns
+    -------
+    tuple
+        (columns, stats) with columns as a dict of numpy arrays, 'date' first.
+    """
+    timeseries = timeseries_with_stats['timeseries']
+    length = len(timeseries['dates'])
+
+    columns = {'date': np.asarray(timeseries['dates']).astype('datetime64[ms]').astype(np.int64)}
+    for name, values in timeseries.items():
+        if name != 'dates':
+            columns['value' if name == 'values' else name] = np.asarray(values, dtype=np.float32)
+
+    stats = {}
+    for key, value in timeseries_with_stats['stats'].items():
+        if isinstance(value, dict) and isinstance(value.get('min'), (list, np.ndarray)) and len(value['min']) == length:
+            columns[f'{key}_min'] = np.asarray(value['min'], dtype=np.float32)
+            columns[f'{key}_max'] = np.asarray(value['max'], dtype=np.float32)
+            value = {k: v for k, v in value.items() if k not in ('min', 'max')}
+        stats[key] = value
+
+    return columns, stats
+
+
+def encode_arrow(columns, metadata):
+    """
+    Encode columns as an Arrow IPC stream with the metadata as JSON in the schema metadata.
+
+    The date column is written as timestamp[ms], i.e. int64 epoch milliseconds.
+    """
+    arrays = {name: pa.array(values, type=pa.timestamp('ms')) if name == 'date' else pa.array(values)
+              for name, values in columns.items()}
+    table = pa.table(arrays).replace_schema_metadata({name: json.dumps(value) for name, value in metadata.items()})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode_msgpack(columns, metadata):
+    """
+    Encode columns as MessagePack.
+
+    Every column is {'dtype': '<i8' or '<f4', 'data': <little-endian bytes>}, so
+    clients can view it as a typed array without parsing; the metadata entries
+    are stored next to 'columns' and 'length'.
+    """
+    body = {'length': len(next(iter(columns.values()))), 'columns': {}}
+    for name, values in columns.items():
+        values = values.astype(values.dtype.newbyteorder('<'))
+        body['columns'][name] = {'dtype': values.dtype.str, 'data': values.tobytes()}
+    body.update(metadata)
+    return msgpack.packb(body, use_bin_type=True)
+
+
+def encode(mimetype, columns, metadata):
+    """
+    Encode columns and metadata in one of the binary_mimetypes.
+    """
+    if mimetype == ARROW_MIMETYPE:
+        return encode_arrow(columns, metadata)
+    elif mimetype == MSGPACK_MIMETYPE:
+        return encode_msgpack(columns, metadata)
+    raise ValueError(f"Unsupported response format: {mimetype}")
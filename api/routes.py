@@ -2,15 +2,26 @@ from flask import jsonify, request, make_response
 from werkzeug.security import check_password_hash
 import jwt
 import datetime
+import itertools
+import json
+import math
 import os
 
 import api_utils
 import utils
-from app import app
+import processors
+import metrics_store
+import cube_store
+import handle_pool
+import block_cache
+import raster_stats
+import dem
+import response_cache
+import response_formats
+from app import app, cfg
 from db_models import Users
 import pandas as pd
 
-from processors import BaseGeoTIFFProcessor
 
 import logging
 from logging.handlers import RotatingFileHandler
@@ -35,6 +46,19 @@ if not app.debug:
 
 GSA_DATAHUB_ROOT = "/home/shared/CRM/11_gsa_datahub/"
 
+handle_pool.configure(max_open=cfg.get('RASTER_HANDLE_POOL_SIZE', handle_pool.DEFAULT_MAX_OPEN))
+utils.configure_extraction(engine=cfg.get('EXTRACTION_ENGINE', 'threading'),
+                           workers=cfg.get('EXTRACTION_WORKERS', 4),
+                           chunk_size=cfg.get('EXTRACTION_CHUNK_SIZE', 64),
+                           async_workers=cfg.get('ASYNC_EXTRACTION_WORKERS', 8))
+
+block_cache.configure(max_bytes=cfg.get('BLOCK_CACHE_MAX_BYTES', block_cache.DEFAULT_MAX_BYTES))
+raster_stats.configure(workers=cfg.get('RASTER_STATS_WORKERS', raster_stats.DEFAULT_WORKERS))
+
+# Serialized /gridTimeseries responses keyed by grid cell, see cached_grid_timeseries
+grid_timeseries_cache = response_cache.ResponseCache(max_bytes=cfg.get('RESPONSE_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+ALTITUDE_PLACEHOLDER = '__altitude__'
+
 
 @app.errorhandler(500)
 def internal_error(exception):
@@ -52,6 +76,126 @@ def bad_request_error(exception):
     return "Bad request", 400
 
 
+def layer_date_filter(dataset_path, layerDate):
+    """
+    Get the month/day file filter of a timeseries request.
+
+    Daily datasets are filtered to the day of month and monthly datasets to the
+    month of the selected layer date; yearly datasets are not filtered.
+    """
+    layerDateCategory = utils.extract_date_category_from_dataset_name(dataset_path)
+    layerDateDt = pd.to_datetime(layerDate) + pd.Timedelta(hours=12)
+
+    if layerDateCategory == 'd':
+        return {'day': layerDateDt.day}
+    elif layerDateCategory == 'm':
+        return {'month': layerDateDt.month}
+    return {}
+
+
+def date_range_filter(request_data):
+    """
+    Get the start/end file filter of a timeseries request.
+
+    start and end are optional date strings; both are inclusive and compared by
+    day, so the dates returned in a timeseries response can be passed back as is.
+
+    Raises
+    ------
+    ValueError
+        If start or end is not a valid date or start is after end.
+    """
+    date_range = {}
+    for param in ('start', 'end'):
+        if request_data.get(param) is not None:
+            date_range[param] = pd.to_datetime(request_data[param]).normalize().to_pydatetime()
+
+    if 'start' in date_range and 'end' in date_range and date_range['start'] > date_range['end']:
+        raise ValueError("start must not be after end")
+    return date_range
+
+
+def reference_periods(request_data):
+    """
+    Get the climate reference periods of the stats of a timeseries request.
+
+    reference_periods is an optional list of "YYYY_YYYY" strings and
+    {"start", "end", "name"} objects; without it the default periods are used.
+    The period names are the keys of the stats next to "overall", so they must
+    be unique and cannot be "overall".
+
+    Raises
+    ------
+    ValueError
+        If a period is invalid, a name is reserved or repeated, or more than
+        utils.MAX_REFERENCE_PERIODS are requested.
+    """
+    periods = request_data.get('reference_periods')
+    if periods is None:
+        return utils.STATS_REFERENCE_PERIODS
+    if not isinstance(periods, list) or len(periods) > utils.MAX_REFERENCE_PERIODS:
+        raise ValueError(f"reference_periods must be a list of at most {utils.MAX_REFERENCE_PERIODS} periods")
+
+    parsed = tuple(utils.parse_reference_period(period) for period in periods)
+    names = set()
+    for name, _, _ in parsed:
+        if name == 'overall':
+            raise ValueError("Reference period name 'overall' is reserved")
+        if name in names:
+            raise ValueError(f"Duplicate reference period name: {name}")
+        names.add(name)
+    return parsed
+
+
+def _is_coordinate(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _is_polygon(rings):
+    return (isinstance(rings, list) and len(rings) > 0 and
+            all(isinstance(ring, list) and len(ring) >= 4 and
+                all(isinstance(position, (list, tuple)) and len(position) >= 2 and all(_is_coordinate(c) for c in position[:2])
+                    for position in ring)
+                for ring in rings))
+
+
+def area_geometry(request_data):
+    """
+    Get the WGS84 polygon of an area request from its geometry or bbox.
+
+    geometry is a GeoJSON Polygon or MultiPolygon, or a Feature holding one;
+    bbox is [min_lng, min_lat, max_lng, max_lat]. Returns None if the request
+    has neither.
+
+    Raises
+    ------
+    ValueError
+        If the geometry or bbox is not of the expected shape or has non-numeric coordinates.
+    """
+    if 'geometry' in request_data:
+        geometry = request_data['geometry']
+        if isinstance(geometry, dict) and geometry.get('type') == 'Feature':
+            geometry = geometry.get('geometry')
+        if not isinstance(geometry, dict) or geometry.get('type') not in ('Polygon', 'MultiPolygon'):
+            raise ValueError("geometry must be a GeoJSON Polygon or MultiPolygon, or a Feature holding one")
+
+        coordinates = geometry.get('coordinates')
+        polygons = [coordinates] if geometry['type'] == 'Polygon' else coordinates
+        if not isinstance(polygons, list) or not polygons or not all(_is_polygon(polygon) for polygon in polygons):
+            raise ValueError(f"Invalid coordinates of the {geometry['type']}: rings must be lists of at least 4 numeric positions")
+        return geometry
+
+    if 'bbox' in request_data:
+        bbox = request_data['bbox']
+        if not isinstance(bbox, list) or len(bbox) != 4 or not all(_is_coordinate(c) for c in bbox):
+            raise ValueError("bbox must be a list of 4 numbers [min_lng, min_lat, max_lng, max_lat]")
+        if bbox[0] >= bbox[2] or bbox[1] >= bbox[3]:
+            raise ValueError("bbox minimum must be below its maximum")
+        return utils.bbox_to_geometry(bbox)
+
+    return None
+
+
 @app.route('/login', methods=['GET'])  
 def login_user(): 
  
@@ -95,6 +239,305 @@ def getTest():
     return res
 
 
+def parse_grid_timeseries_request(request_data, required_params=('dataset', 'variable', 'layerDate', 'lat', 'lng')):
+    """
+    Validate and normalize the parameters of a grid timeseries request.
+
+    Parameters
+    ----------
+    request_data : dict
+        The JSON body of the request.
+    required_params : tuple
+        The parameters that have to be present.
+
+    Returns
+    -------
+    tuple
+        (params, None) with the normalized parameters, or (None, response) with
+        the 400 response for a missing parameter.
+    """
+    for param in required_params:
+        if param not in request_data:
+            app.logger.error(f"Missing required parameter: {param}")
+            return None, make_response(f"Missing required parameter: {param}", 400)
+
+    params = {
+        'dataset': request_data['dataset'],
+        'variable': request_data['variable'],
+        'layerDate': request_data['layerDate'],
+        'lat': request_data.get('lat'),
+        'lng': request_data.get('lng'),
+        'climate': request_data.get('climate', False),
+        'climatePeriod': request_data.get('climate_period', None),
+    }
+
+    # Only prepend '/climate_data/' if climate is True
+    if params['climate'] == True:
+        params['dataset_path'] = f"/climate_data/{params['dataset']}"
+    else:
+        params['dataset_path'] = params['dataset']
+        params['climatePeriod'] = None
+
+    params['date_filter'] = layer_date_filter(params['dataset_path'], params['layerDate'])
+    try:
+        params['date_filter'].update(date_range_filter(request_data))
+    except ValueError as e:
+        app.logger.error(f"Invalid date range: {str(e)}")
+        return None, make_response(f"Invalid date range: {str(e)}", 400)
+
+    try:
+        params['referencePeriods'] = reference_periods(request_data)
+    except ValueError as e:
+        app.logger.error(f"Invalid reference periods: {str(e)}")
+        return None, make_response(f"Invalid reference periods: {str(e)}", 400)
+
+    return params, None
+
+
+def extract_altitude(lat, lng):
+    """
+    Get the DEM altitude record (path, value) at a point from the memory-resident DEM.
+
+    Returns
+    -------
+    tuple or None
+        (path, value) with the raw DEM value, or None if the point is outside
+        the DEM or there is no DEM.
+    """
+    elevation_model = dem.get_dem()
+    if elevation_model is None:
+        return None
+    values, inside = elevation_model.lookup([lat], [lng])
+    if not inside[0]:
+        return None
+    return (elevation_model.path, values[0])
+
+
+def grid_timeseries_stats_path(params):
+    """
+    Get the path of the idr/iqr statistics file of a grid timeseries request.
+    """
+    dataset = params['dataset']
+    variable = params['variable']
+
+    if params['climate'] == True:
+        return f"{GSA_DATAHUB_ROOT}/climate_data/statistics/{dataset}/{variable}/geotiff_metrics_timeseries.csv"
+    return f"{GSA_DATAHUB_ROOT}/statistics/{dataset}/{variable}/geotiff_metrics_timeseries.csv"
+
+
+def load_grid_timeseries_stats(params):
+    """
+    Load the idr/iqr statistics table of a grid timeseries request, restricted to its climate period.
+
+    The table comes from the process-wide metrics_store table cache, indexed by
+    datetime; the ranges are typed '<column>_lo'/'<column>_hi' columns.
+    """
+    climate_period = params['climatePeriod'] if params['climate'] == True else None
+    return metrics_store.get_table_cache().get(grid_timeseries_stats_path(params), climate_period)
+
+
+def join_grid_timeseries_stats(timeseries_df, idr_iqr):
+    """
+    Add the statistics columns of the dates of a timeseries frame by an indexed lookup.
+    """
+    stats_rows = metrics_store.lookup_metrics(idr_iqr, timeseries_df['datetime'])
+    for column in stats_rows.columns:
+        timeseries_df[column] = stats_rows[column].to_numpy()
+    return timeseries_df
+
+
+def build_grid_timeseries_object(params, timeseries):
+    """
+    Merge an extracted timeseries with the dataset statistics.
+
+    Returns
+    -------
+    dict or None
+        The timeseries object without altitude, or None if there is no data.
+    """
+    if timeseries is None:
+        return None
+
+    idr_iqr = load_grid_timeseries_stats(params)
+
+    timeseries = join_grid_timeseries_stats(pd.DataFrame(timeseries, columns=['datetime', 'value']), idr_iqr)
+    timeseries['datetime'] = timeseries['datetime'] + pd.Timedelta(hours=12)
+
+    timeseries_with_stats = utils.create_timeseries_object(timeseries, params['referencePeriods'])
+
+    return timeseries_with_stats or None
+
+
+def json_response(data, status=200):
+    """
+    Build a JSON response with the vectorized serializer of response_formats.
+    """
+    return app.response_class(response_formats.dumps(data), status=status, mimetype='application/json')
+
+
+def grid_timeseries_cache_key(params, cell):
+    """
+    Get the response cache key of a grid timeseries request.
+
+    The key uses the grid cell the point falls into instead of the raw lat/lng,
+    so all clicks within the same cell share one entry.
+    """
+    return (params['dataset_path'], params['variable'], cell.row, cell.col,
+            tuple(sorted(params['date_filter'].items())), params['climatePeriod'], params['referencePeriods'])
+
+
+def grid_timeseries_cache_validators(params):
+    """
+    Get the mtimes of the data directory, the statistics files and the point cube store a cached response depends on.
+
+    The point cube's meta.json is replaced by every build or append of the
+    store, so an ingest invalidates responses served from the previous cube
+    even if the data directory did not change since. A missing file has the
+    validator None, so creating or removing it invalidates as well.
+    """
+    data_dir = f"{utils.GSA_DATAHUB_ROOT}/{params['dataset_path']}/{params['variable']}"
+    stats_path = grid_timeseries_stats_path(params)
+    cube_meta_path = os.path.join(cube_store.point_cube_dir(params['dataset_path'], params['variable']), cube_store.META_FILENAME)
+    return response_cache.mtime_validators(data_dir, stats_path, metrics_store.parquet_path(stats_path), cube_meta_path)
+
+
+def serialize_grid_timeseries(timeseries_with_stats):
+    """
+    Serialize a timeseries object into a response template.
+
+    The altitude is looked up per point on the finer DEM grid, so it is left out of
+    the cached body: the serialized JSON is split at the altitude placeholder into
+    a prefix and suffix.
+    """
+    timeseries_with_stats['stats']['altitude'] = ALTITUDE_PLACEHOLDER
+    body = response_formats.dumps(timeseries_with_stats)
+    prefix, suffix = body.split(f'"{ALTITUDE_PLACEHOLDER}"'.encode(), 1)
+    return prefix, suffix
+
+
+def grid_timeseries_response(template, altitude):
+    """
+    Build the JSON response from a serialized timeseries template and the altitude record.
+    """
+    altitude_value = altitude[-1] if altitude is not None else None
+    prefix, suffix = template
+    body = prefix + response_formats.dumps(altitude_value) + suffix
+    return app.response_class(body, mimetype='application/json')
+
+
+def cached_grid_timeseries(params, cell, extract_timeseries):
+    """
+    Get the serialized timeseries template of a request from the response cache,
+    or build and cache it with extract_timeseries().
+
+    Returns
+    -------
+    tuple or None
+        The (prefix, suffix) template, or None if there is no data.
+    """
+    key = grid_timeseries_cache_key(params, cell)
+    validators = grid_timeseries_cache_validators(params)
+
+    template = grid_timeseries_cache.get(key, validators)
+    if template is not None:
+        return template
+
+    timeseries_with_stats = build_grid_timeseries_object(params, extract_timeseries())
+    if timeseries_with_stats is None:
+        return None
+
+    template = serialize_grid_timeseries(timeseries_with_stats)
+    grid_timeseries_cache.put(key, validators, template, len(template[0]) + len(template[1]))
+    return template
+
+
+def not_acceptable_response(offered=(response_formats.JSON_MIMETYPE,)):
+    """
+    Build the 406 response for a request whose Accept header matches none of the available formats.
+    """
+    available = ', '.join(list(offered) + response_formats.binary_mimetypes())
+    return make_response(f"Not acceptable, available formats: {available}", 406)
+
+
+def binary_timeseries_response(mimetype, timeseries_with_stats, altitude=None):
+    """
+    Build an Arrow IPC or MessagePack response from a timeseries object.
+
+    The series are sent as typed columns (dates as int64 epoch milliseconds,
+    values as float32), the stats and altitude as metadata, see response_formats.
+    """
+    columns, stats = response_formats.timeseries_columns(timeseries_with_stats)
+    if altitude is not None:
+        stats['altitude'] = altitude[-1]
+    # Round trip through the JSON serializer so the metadata holds exactly the values of the JSON response
+    stats = json.loads(response_formats.dumps(stats))
+    body = response_formats.encode(mimetype, columns, {'stats': stats})
+    return app.response_class(body, mimetype=mimetype)
+
+
+def stream_grid_timeseries(params, chunks, altitude):
+    """
+    Stream a grid timeseries as NDJSON.
+
+    Every line but the last is one record {"date", "value", "idr_full": [min, max], ...}
+    in chronological order; the records of a chunk are sent as soon as it has been
+    extracted. The last line is {"stats": {...}} with the statistics of the whole
+    series, the mean of the per-record ranges and the altitude.
+
+    Parameters
+    ----------
+    params : dict
+        The parsed request parameters.
+    chunks : iterator
+        Chunks of (datetime, value) tuples, see utils.iter_timeseries_from_dataset.
+    altitude : tuple or None
+        The DEM altitude record of the point.
+    """
+    range_keys = metrics_store.RANGE_COLUMNS
+    idr_iqr = load_grid_timeseries_stats(params)
+
+    def generate():
+        series = []
+        range_min_sums = dict.fromkeys(range_keys, 0.0)
+        range_counts = dict.fromkeys(range_keys, 0)
+
+        for chunk in chunks:
+            chunk_df = join_grid_timeseries_stats(pd.DataFrame(chunk, columns=['datetime', 'value']), idr_iqr)
+            chunk_df['datetime'] = chunk_df['datetime'] + pd.Timedelta(hours=12)
+
+            lines = []
+            for row in chunk_df.itertuples(index=False):
+                record = {'date': row.datetime.strftime("%Y-%m-%d %H:%M:%S"), 'value': row.value}
+                for key in range_keys:
+                    record[key] = [getattr(row, f'{key}_lo'), getattr(row, f'{key}_hi')]
+                    if not pd.isna(record[key][0]):
+                        range_min_sums[key] += record[key][0]
+                        range_counts[key] += 1
+                lines.append(response_formats.dumps(record))
+                series.append((row.datetime, row.value))
+            yield b'\n'.join(lines) + b'\n'
+
+        stats = utils.calculate_stats_for_timeseries(pd.DataFrame(series, columns=['datetime', 'value']), params['referencePeriods'])
+        for key in range_keys:
+            stats[key] = {'mean': range_min_sums[key] / range_counts[key] if range_counts[key] else None}
+        stats['altitude'] = altitude[-1] if altitude is not None else None
+        yield response_formats.dumps({'stats': stats}) + b'\n'
+
+    return app.response_class(generate(), mimetype='application/x-ndjson')
+
+
+@app.route('/cacheStats', methods=['GET'])
+def getCacheStats():
+    """
+    Get the size and hit/miss counters of the in-process caches of this worker.
+    """
+    return json_response({
+        'block_cache': block_cache.get_cache().stats(),
+        'response_cache': grid_timeseries_cache.stats(),
+        'open_raster_handles': len(handle_pool.get_pool()),
+    })
+
+
 @app.route('/gridTimeseries', methods=['POST'])
 def getGridTimeseries():
     """
@@ -106,115 +549,381 @@ def getGridTimeseries():
     - layerDate (datetime): The date of the layer, in datetime string.
     - lat (float): Latitude of the point of interest.
     - lng (float): Longitude of the point of interest.
+    - start (str, optional): First date of the timeseries (inclusive).
+    - end (str, optional): Last date of the timeseries (inclusive).
+    - climate_period (str, optional): Climate period of climate datasets, e.g. '1991_2020'.
+    - reference_periods (list, optional): Reference periods of the stats, as "YYYY_YYYY" strings (e.g. "1981_2010")
+      or {"start": date, "end": date, "name": str} objects; defaults to 1961_1991 and 1991_2020.
+    - stream (bool, optional): Stream the timeseries as NDJSON (also selected by "Accept: application/x-ndjson").
+
+    Only the files within start/end and the climate period are opened.
 
     Returns:
     - JSON response containing timeseries data with statistics and altitude if successful, or HTTP 204 response if no data is found.
+    - With stream, an NDJSON response with one line per record in chronological order and the stats as the last line,
+      see stream_grid_timeseries. Streamed responses are not cached.
+    - With "Accept: application/vnd.apache.arrow.stream" or "application/msgpack", the timeseries as typed binary
+      columns with the stats as metadata (see response_formats), or HTTP 406 if the encoder is not installed.
+      Binary responses are not cached.
     """
     try:
         request_data = request.get_json()
+        params, error_response = parse_grid_timeseries_request(request_data)
+        if error_response is not None:
+            return error_response
+
+        text_mimetypes = (response_formats.JSON_MIMETYPE, response_formats.NDJSON_MIMETYPE)
+        mimetype = response_formats.negotiate(request.accept_mimetypes, text_mimetypes)
+        if mimetype is None:
+            return not_acceptable_response(text_mimetypes)
+
+        # Reject points outside the dataset footprint before any raster is opened
+        cell = utils.locate_point_in_dataset(params['dataset_path'], params['variable'], params['lat'], params['lng'])
+        if cell is None:
+            return make_response('', 204)
 
-        # Validate required parameters
-        required_params = ['dataset', 'variable', 'layerDate', 'lat', 'lng']
-        for param in required_params:
-            if param not in request_data:
-                app.logger.error(f"Missing required parameter: {param}")
-                return make_response(f"Missing required parameter: {param}", 400)
+        altitude = extract_altitude(params['lat'], params['lng'])
+
+        if mimetype in response_formats.binary_mimetypes():
+            timeseries_with_stats = build_grid_timeseries_object(params, utils.get_timeseries_from_dataset(
+                params['dataset_path'], params['variable'], params['lat'], params['lng'],
+                climate_period=params['climatePeriod'], **params['date_filter']))
+            if timeseries_with_stats is None:
+                return make_response('', 204)
+            return binary_timeseries_response(mimetype, timeseries_with_stats, altitude)
+
+        if request_data.get('stream', False) == True or mimetype == response_formats.NDJSON_MIMETYPE:
+            chunks = utils.iter_timeseries_from_dataset(
+                params['dataset_path'], params['variable'], params['lat'], params['lng'],
+                chunk_size=cfg.get('GRID_TIMESERIES_STREAM_CHUNK_SIZE', 256),
+                climate_period=params['climatePeriod'], **params['date_filter'])
+            # Read the first chunk before answering, so a series without data is still a 204
+            first_chunk = next(chunks, None)
+            if first_chunk is None:
+                return make_response('', 204)
+            return stream_grid_timeseries(params, itertools.chain([first_chunk], chunks), altitude)
+
+        template = cached_grid_timeseries(params, cell, lambda: utils.get_timeseries_from_dataset(
+            params['dataset_path'], params['variable'], params['lat'], params['lng'],
+            climate_period=params['climatePeriod'], **params['date_filter']))
+
+        if template is None:
+            return make_response('', 204)
+        return grid_timeseries_response(template, altitude)
+    except Exception as e:
+        app.logger.error(f"Error in getGridTimeseries: {str(e)}", exc_info=True)
+        return make_response(f"An error occurred: {str(e)}", 500)
 
-        dataset = request_data['dataset']
-        variable = request_data['variable']
-        layerDate = request_data['layerDate']
-        lat = request_data['lat']
-        lng = request_data['lng']
-        climate = request_data.get('climate', False)
-        climatePeriod = request_data.get('climate_period', None)
 
-        # Only prepend '/climate_data/' if climate is True
-        if climate == True:
-            dataset_path = f"/climate_data/{dataset}" 
-        else: 
-            dataset_path = dataset
-            climatePeriod = None
+@app.route('/gridTimeseriesAsync', methods=['POST'])
+async def getGridTimeseriesAsync():
+    """
+    Async variant of /gridTimeseries with the same parameters and response.
 
-        layerDateCategory = utils.extract_date_category_from_dataset_name(dataset_path)
-        layerDateDt = pd.to_datetime(layerDate) + pd.Timedelta(hours=12)
+    Under Flask (WSGI) an async view runs on its own event loop in the worker
+    thread of its request, so it does not overlap with other requests. The
+    blocking steps (point lookup, raster reads, altitude and stats) run on the
+    shared thread pool of the async extraction engine, which bounds the number
+    of concurrent reads of all async requests of the process.
+    """
+    try:
+        params, error_response = parse_grid_timeseries_request(request.get_json())
+        if error_response is not None:
+            return error_response
 
-        geotiff_processor = BaseGeoTIFFProcessor(GSA_DATAHUB_ROOT)
-        dem_fp = f"{GSA_DATAHUB_ROOT}/dem/output_COP90_31287.tif"
-        altitude = geotiff_processor.extract_value_from_geotiff((dem_fp, lat, lng))
+        mimetype = response_formats.negotiate(request.accept_mimetypes)
+        if mimetype is None:
+            return not_acceptable_response()
 
-        if layerDateCategory == 'd':
-            timeseries = utils.get_timeseries_from_dataset(dataset_path, variable, lat, lng, day=layerDateDt.day, climate_period=climatePeriod)
-        elif layerDateCategory == 'm':
-            timeseries = utils.get_timeseries_from_dataset(dataset_path, variable, lat, lng, month=layerDateDt.month, climate_period=climatePeriod)
-        else:
-            timeseries = utils.get_timeseries_from_dataset(dataset_path, variable, lat, lng, climate_period=climatePeriod)
+        engine = processors.get_async_engine()
 
-        # Build the correct path for idr_iqr file
-        if climate == True:
-            stats_fp = f"{GSA_DATAHUB_ROOT}/climate_data/statistics/{dataset}/{variable}/geotiff_metrics_timeseries.csv"
-        else:
-            stats_fp = f"{GSA_DATAHUB_ROOT}/statistics/{dataset}/{variable}/geotiff_metrics_timeseries.csv"
+        cell = await engine.run_blocking(utils.locate_point_in_dataset, params['dataset_path'], params['variable'], params['lat'], params['lng'])
+        if cell is None:
+            return make_response('', 204)
 
-        idr_iqr = pd.read_csv(stats_fp)
-        idr_iqr['datetime'] = pd.to_datetime(idr_iqr['datetime'])
+        altitude = await engine.run_blocking(extract_altitude, params['lat'], params['lng'])
+
+        if mimetype in response_formats.binary_mimetypes():
+            timeseries = await utils.get_timeseries_from_dataset_async(params['dataset_path'], params['variable'], params['lat'], params['lng'],
+                                                                       climate_period=params['climatePeriod'], **params['date_filter'])
+            timeseries_with_stats = await engine.run_blocking(build_grid_timeseries_object, params, timeseries)
+            if timeseries_with_stats is None:
+                return make_response('', 204)
+            return binary_timeseries_response(mimetype, timeseries_with_stats, altitude)
+
+        key = grid_timeseries_cache_key(params, cell)
+        validators = grid_timeseries_cache_validators(params)
+        template = grid_timeseries_cache.get(key, validators)
+
+        if template is None:
+            timeseries = await utils.get_timeseries_from_dataset_async(params['dataset_path'], params['variable'], params['lat'], params['lng'],
+                                                                       climate_period=params['climatePeriod'], **params['date_filter'])
+            timeseries_with_stats = await engine.run_blocking(build_grid_timeseries_object, params, timeseries)
+            if timeseries_with_stats is None:
+                return make_response('', 204)
+            template = serialize_grid_timeseries(timeseries_with_stats)
+            grid_timeseries_cache.put(key, validators, template, len(template[0]) + len(template[1]))
+
+        return grid_timeseries_response(template, altitude)
+    except Exception as e:
+        app.logger.error(f"Error in getGridTimeseriesAsync: {str(e)}", exc_info=True)
+        return make_response(f"An error occurred: {str(e)}", 500)
+    
 
-        if climate == True:
-            idr_iqr = idr_iqr[idr_iqr['climate_period'] == climatePeriod]
+def parse_raster_stats_request(request_data):
+    """
+    Validate the parameters of a raster stats request and build the layer path.
+
+    Returns
+    -------
+    tuple
+        (params, None) with the parameters and the layer path, or (None, response)
+        with the 400 response for a missing or invalid parameter.
+    """
+    required_params = ['dataset', 'variable', 'selectedLayerName']
+    for param in required_params:
+        if param not in request_data:
+            app.logger.error(f"Missing required parameter: {param}")
+            return None, make_response(f"Missing required parameter: {param}", 400)
+
+    params = {
+        'dataset': request_data['dataset'],
+        'variable': request_data['variable'],
+        'layer_name': request_data['selectedLayerName'],
+        'climate': request_data.get('climate', False),
+        'climatePeriod': request_data.get('climate_period', None),
+    }
+
+    # Optional histogram and quantiles for colour scales, e.g. {"histogram_bins": 64, "quantiles": [0.02, 0.98]}
+    histogram_bins = request_data.get('histogram_bins')
+    quantiles = request_data.get('quantiles')
+    try:
+        params['histogramBins'] = None if histogram_bins is None else raster_stats.validate_histogram_bins(histogram_bins)
+        params['quantiles'] = None if quantiles is None else raster_stats.validate_quantiles(quantiles)
+    except ValueError as e:
+        app.logger.error(f"Invalid raster stats request: {str(e)}")
+        return None, make_response(str(e), 400)
+
+    climate_fp = "climate_data" if params['climate'] else ''
+    params['layer_fp'] = f"{GSA_DATAHUB_ROOT}/{climate_fp}/{params['dataset']}/{params['variable']}/{params['layer_name']}.tif"
+
+    app.logger.info(f"Looking for raster file: {params['layer_fp']}")
+
+    return params, None
+
+
+def raster_stats_response(params, raster_stats):
+    """
+    Build the response of a raster stats request.
+    """
+    raster_stats['layer'] = params['layer_name']
+    raster_stats['dataset'] = params['dataset']
 
-        timeseries_df = pd.DataFrame(timeseries, columns=['datetime', 'value'])
-        timeseries = timeseries_df.merge(idr_iqr, how='left', on='datetime')
-        timeseries['datetime'] = timeseries['datetime'] + pd.Timedelta(hours=12)
+    return json_response(raster_stats)
 
-        timeseries_with_stats = utils.create_timeseries_object(timeseries)
 
-        timeseries_with_stats['stats']['altitude'] = altitude[-1]
+def raster_not_found_response(params):
+    app.logger.warning(f"Raster file not found: {params['layer_fp']}")
+    return make_response(f"Raster file {params['layer_name']} does not exist on the server", 204)
+
+
+@app.route('/rasterStats', methods=['POST'])
+def getRasterStats():
+    """
+    Get min, max and mean stats and the valid and nodata pixel counts of a raster file,
+    served from the precomputed raster stats store when it is current, and optionally
+    a histogram ('histogram_bins') and approximate quantiles ('quantiles')
+    """
+    try:
+        params, error_response = parse_raster_stats_request(request.get_json())
+        if error_response is not None:
+            return error_response
 
-        if timeseries_with_stats:
-            return utils.convert_float32(timeseries_with_stats)
+        if os.path.exists(params['layer_fp']): 
+            # Extract statistics
+            raster_stats = utils.get_raster_stats(params['layer_fp'], params['variable'], params['dataset'],
+                                                  params['histogramBins'], params['quantiles'])
+            return raster_stats_response(params, raster_stats)
+        else:
+            return raster_not_found_response(params)
+    except Exception as e:
+        app.logger.error(f"Error in getRasterStats: {str(e)}", exc_info=True)
+        return make_response(f"An error occurred: {str(e)}", 500)
+
+
+@app.route('/rasterStatsAsync', methods=['POST'])
+async def getRasterStatsAsync():
+    """
+    Async variant of /rasterStats with the same parameters and response.
+    """
+    try:
+        params, error_response = parse_raster_stats_request(request.get_json())
+        if error_response is not None:
+            return error_response
+
+        if os.path.exists(params['layer_fp']): 
+            raster_stats = await utils.get_raster_stats_async(params['layer_fp'], params['variable'], params['dataset'],
+                                                              params['histogramBins'], params['quantiles'])
+            return raster_stats_response(params, raster_stats)
         else:
+            return raster_not_found_response(params)
+    except Exception as e:
+        app.logger.error(f"Error in getRasterStatsAsync: {str(e)}", exc_info=True)
+        return make_response(f"An error occurred: {str(e)}", 500)
+
+
+@app.route('/areaTimeseries', methods=['POST'])
+def getAreaTimeseries():
+    """
+    Get the area mean timeseries within a polygon or bounding box.
+
+    Parameters:
+    - dataset (str): The dataset identifier, e.g., 'spartacus-v2-1y-1km'.
+    - variable (str): The variable of interest, e.g., 'TM'.
+    - layerDate (datetime): The date of the layer, in datetime string.
+    - geometry (dict): GeoJSON Polygon/MultiPolygon geometry or Feature in WGS84, or
+    - bbox (list): Bounding box [min_lng, min_lat, max_lng, max_lat] in WGS84.
+
+    Returns:
+    - JSON response shaped like /gridTimeseries, with the area mean as values and the
+      area min/max per time step in timeseries.min/timeseries.max, or HTTP 204 if the
+      area does not cover the dataset grid. Arrow IPC and MessagePack are negotiated as for /gridTimeseries.
+    """
+    try:
+        request_data = request.get_json()
+        params, error_response = parse_grid_timeseries_request(request_data, required_params=('dataset', 'variable', 'layerDate'))
+        if error_response is not None:
+            return error_response
+
+        mimetype = response_formats.negotiate(request.accept_mimetypes)
+        if mimetype is None:
+            return not_acceptable_response()
+
+        try:
+            geometry = area_geometry(request_data)
+        except ValueError as e:
+            app.logger.error(f"Invalid area: {str(e)}")
+            return make_response(f"Invalid area: {str(e)}", 400)
+        if geometry is None:
+            app.logger.error("Missing required parameter: geometry or bbox")
+            return make_response("Missing required parameter: geometry or bbox", 400)
+
+        area_timeseries = utils.get_area_timeseries_from_dataset(params['dataset_path'], params['variable'], geometry,
+                                                                 climate_period=params['climatePeriod'], **params['date_filter'])
+        if area_timeseries is None:
             return make_response('', 204)
+
+        timeseries_with_stats = build_grid_timeseries_object(params, [(dt, mean) for dt, mean, _, _ in area_timeseries])
+        if timeseries_with_stats is None:
+            return make_response('', 204)
+
+        timeseries_with_stats['timeseries']['min'] = [min_val for _, _, min_val, _ in area_timeseries]
+        timeseries_with_stats['timeseries']['max'] = [max_val for _, _, _, max_val in area_timeseries]
+
+        if mimetype in response_formats.binary_mimetypes():
+            return binary_timeseries_response(mimetype, timeseries_with_stats)
+        return json_response(timeseries_with_stats)
     except Exception as e:
-        app.logger.error(f"Error in getGridTimeseries: {str(e)}", exc_info=True)
+        app.logger.error(f"Error in getAreaTimeseries: {str(e)}", exc_info=True)
         return make_response(f"An error occurred: {str(e)}", 500)
-    
 
-@app.route('/rasterStats', methods=['POST'])
-def getRasterStats():
+
+@app.route('/gridTimeseriesBatch', methods=['POST'])
+def getGridTimeseriesBatch():
     """
-    Get min, max and mean stats from a raster file
+    Get the grid timeseries of many points with one read per file.
+
+    Parameters:
+    - dataset (str): The dataset identifier, e.g., 'spartacus-v2-1y-1km'.
+    - variable (str): The variable of interest, e.g., 'TM'.
+    - layerDate (datetime): The date of the layer, in datetime string.
+    - points (list): Points of interest, each as {"lat": float, "lng": float}.
+    - start, end (str, optional): Inclusive date range of the timeseries.
+
+    Returns:
+    - JSON response with the timeseries keyed by "<lat>,<lng>" for every requested point,
+      null for points outside the dataset grid.
     """
     try:
         request_data = request.get_json()
-        
-        # Validate required parameters
-        required_params = ['dataset', 'variable', 'selectedLayerName']
+
+        required_params = ['dataset', 'variable', 'layerDate', 'points']
         for param in required_params:
             if param not in request_data:
                 app.logger.error(f"Missing required parameter: {param}")
                 return make_response(f"Missing required parameter: {param}", 400)
-        
+
         dataset = request_data['dataset']
         variable = request_data['variable']
-        layer_name = request_data['selectedLayerName']
+        layerDate = request_data['layerDate']
+        points = request_data['points']
         climate = request_data.get('climate', False)
         climatePeriod = request_data.get('climate_period', None)
 
-        climate_fp = "climate_data" if climate else ''
-        layer_fp = f"{GSA_DATAHUB_ROOT}/{climate_fp}/{dataset}/{variable}/{layer_name}.tif"
-        
-        app.logger.info(f"Looking for raster file: {layer_fp}")
-        
-        if os.path.exists(layer_fp): 
-            # Extract statistics
-            raster_stats = utils.get_raster_stats(layer_fp, variable, dataset)
-            
-            raster_stats['layer'] = layer_name
-            raster_stats['dataset'] = dataset
-            
-            return utils.convert_float32(raster_stats)
+        if not points or not all('lat' in point and 'lng' in point for point in points):
+            return make_response("Parameter points must be a non-empty list of {lat, lng} objects", 400)
+
+        try:
+            date_range = date_range_filter(request_data)
+        except ValueError as e:
+            return make_response(f"Invalid date range: {str(e)}", 400)
+
+        if climate == True:
+            dataset_path = f"/climate_data/{dataset}"
         else:
-            app.logger.warning(f"Raster file not found: {layer_fp}")
-            return make_response(f'Raster file {layer_name} does not exist on the server', 204)
+            dataset_path = dataset
+            climatePeriod = None
+
+        lats = [point['lat'] for point in points]
+        lngs = [point['lng'] for point in points]
+
+        timeseries = utils.get_timeseries_for_points(dataset_path, variable, lats, lngs, climate_period=climatePeriod,
+                                                     **layer_date_filter(dataset_path, layerDate), **date_range)
+
+        results = {}
+        for lat, lng, point_timeseries in zip(lats, lngs, timeseries):
+            if point_timeseries is None:
+                results[f"{lat},{lng}"] = None
+            else:
+                results[f"{lat},{lng}"] = utils.convert_timeseries_tuple_to_dict(
+                    [(dt + datetime.timedelta(hours=12), value) for dt, value in point_timeseries])
+
+        return json_response({'dataset': dataset, 'variable': variable, 'results': results})
     except Exception as e:
-        app.logger.error(f"Error in getRasterStats: {str(e)}", exc_info=True)
-        return make_response(f"An error occurred: {str(e)}", 500)
\ No newline at end of file
+        app.logger.error(f"Error in getGridTimeseriesBatch: {str(e)}", exc_info=True)
+        return make_response(f"An error occurred: {str(e)}", 500)
+
+
+@app.route('/altitudeBatch', methods=['POST'])
+def getAltitudeBatch():
+    """
+    Get the DEM altitude of many points with one vectorized lookup in the memory-resident DEM.
+
+    Parameters:
+    - points (list): Points of interest, each as {"lat": float, "lng": float}.
+
+    Returns:
+    - JSON response with the altitudes keyed by "<lat>,<lng>" for every requested point,
+      null for points outside the DEM or on nodata pixels.
+    """
+    try:
+        request_data = request.get_json()
+
+        points = request_data.get('points')
+        if not points or not all('lat' in point and 'lng' in point for point in points):
+            return make_response("Parameter points must be a non-empty list of {lat, lng} objects", 400)
+
+        elevation_model = dem.get_dem()
+        if elevation_model is None:
+            app.logger.warning(f"DEM not found: {dem.default_dem_path()}")
+            return make_response("The DEM does not exist on the server", 204)
+
+        lats = [point['lat'] for point in points]
+        lngs = [point['lng'] for point in points]
+        altitudes = elevation_model.altitudes(lats, lngs).tolist()
+
+        results = {f"{lat},{lng}": altitude for lat, lng, altitude in zip(lats, lngs, altitudes)}
+        return json_response({'results': results})
+    except Exception as e:
+        app.logger.error(f"Error in getAltitudeBatch: {str(e)}", exc_info=True)
+        return make_response(f"An error occurred: {str(e)}", 500)
@@ -0,0 +1,141 @@
+"""
+Micro-benchmark of utils.calculate_stats_for_timeseries.
+
+Compares the NumPy implementation with the previous pandas implementation on
+synthetic float32 series of 100, 10k and 1M points between 1961 and 2024,
+checks that both return identical statistics and prints the median time. The
+reference period means are accumulated in float64 from prefix sums and may
+differ from the float32 pandas means in the last float32 digit, so means are
+compared within float32 rounding. Besides the timed continuous series, the
+identity check covers series with many tied values (zero-heavy, like daily
+precipitation, and rounded), with rows out of time order, where the tie
+order of sort_values and idxmin/idxmax matters, and integer series, whose
+means must not be truncated to the integer dtype. The last column times ten
+reference periods instead of the default two::
+
+    python benchmarks/bench_timeseries_stats.py
+    python benchmarks/bench_timeseries_stats.py --sizes 1000 100000 --repeats 10
+"""
+
+import argparse
+import math
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+
+DEFAULT_SIZES = (100, 10_000, 1_000_000)
+SERIES_KINDS = ('normal', 'zero_heavy', 'rounded', 'shuffled', 'int16', 'uint16')
+TEN_PERIODS = [utils.parse_reference_period(f"{year}_{year + 29}") for year in range(1961, 2000, 4)][:10]
+
+
+def calculate_stats_for_timeseries_pandas(df):
+    """The pandas implementation that calculate_stats_for_timeseries replaced, as reference."""
+    if pd.api.types.is_datetime64_any_dtype(df['datetime']):
+        df['datetime'] = df['datetime'].apply(lambda x: x.strftime("%Y-%m-%d %H:%M:%S"))
+
+    overall_mean = df['value'].mean()
+    overall_min = df.loc[df['value'].idxmin()].values.tolist()
+    overall_max = df.loc[df['value'].idxmax()].values.tolist()
+    overall_top5 = df.sort_values(by='value', ascending=False)[:5]
+    overall_bottom5 = df.sort_values(by='value', ascending=True)[:5]
+
+    period1_df = df[(df['datetime'] >= "1961-01-01 00:00:00") & (df['datetime'] <= "1991-12-31 23:59:59")]
+    period1_mean = period1_df['value'].mean()
+    period1_min = period1_df.loc[period1_df['value'].idxmin()].values.tolist()
+    period1_max = period1_df.loc[period1_df['value'].idxmax()].values.tolist()
+
+    period2_df = df[(df['datetime'] >= "1991-01-01 00:00:00") & (df['datetime'] <= "2020-12-31 23:59:59")]
+    period2_mean = period2_df['value'].mean()
+    period2_min = period2_df.loc[period2_df['value'].idxmin()].values.tolist()
+    period2_max = period2_df.loc[period2_df['value'].idxmax()].values.tolist()
+
+    format_result = lambda result: {'date': result[0], 'value': result[1]}
+
+    return {
+        'current_location_stats': {
+            'overall': {'mean': overall_mean, 'min': format_result(overall_min), 'max': format_result(overall_max),
+                        'top5': {'date': list(overall_top5['datetime'].values), 'value': list(overall_top5['value'].values)},
+                        'bottom5': {'date': list(overall_bottom5['datetime'].values), 'value': list(overall_bottom5['value'].values)}
+                        },
+            '1961_1991': {'mean': period1_mean, 'min': format_result(period1_min), 'max': format_result(period1_max)},
+            '1991_2020': {'mean': period2_mean, 'min': format_result(period2_min), 'max': format_result(period2_max)}
+        }
+    }
+
+
+def make_series(n: int, seed: int = 0, kind: str = 'normal') -> pd.DataFrame:
+    """
+    Returns a synthetic series with 1% NaN values.
+
+    kind is one of SERIES_KINDS: continuous values, 70% zeros and rounded
+    values, values rounded to integers, rounded values in shuffled row order,
+    an int16 series (without NaN) like an integer-valued raster, or a uint16
+    series of distinct values up to 65536 points.
+    """
+    rng = np.random.default_rng(seed)
+    datetimes = pd.date_range("1961-01-01", "2024-12-31", periods=n).floor('s')
+    values = rng.normal(10, 5, n).astype(np.float32)
+    if kind == 'zero_heavy':
+        values = np.where(rng.random(n) < 0.7, 0, np.round(np.abs(values), 1)).astype(np.float32)
+    elif kind in ('rounded', 'shuffled'):
+        values = np.round(values).astype(np.float32)
+    elif kind == 'int16':
+        values = np.round(values).astype(np.int16)
+    elif kind == 'uint16':
+        values = (rng.permutation(n) % 65536).astype(np.uint16)
+    if values.dtype.kind == 'f':
+        values[rng.random(n) < 0.01] = np.nan
+    df = pd.DataFrame({'datetime': datetimes, 'value': values})
+    if kind == 'shuffled':
+        df = df.iloc[rng.permutation(n)].reset_index(drop=True)
+    return df
+
+
+def identical(a, b, key: str = None) -> bool:
+    """Compares two results exactly, including the types of the values; NaN equals NaN and means match within float32 rounding."""
+    if type(a) != type(b):
+        return False
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(identical(a[k], b[k], k) for k in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(identical(x, y) for x, y in zip(a, b))
+    if isinstance(a, (float, np.floating)) and math.isnan(a):
+        return math.isnan(b)
+    if key == 'mean':
+        return bool(np.isclose(a, b, rtol=1e-6, atol=0))
+    return a == b
+
+
+def median_seconds(func, df: pd.DataFrame, repeats: int) -> float:
+    durations = []
+    for _ in range(repeats):
+        frame = df.copy()
+        start_time = time.perf_counter()
+        func(frame)
+        durations.append(time.perf_counter() - start_time)
+    return statistics.median(durations)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark calculate_stats_for_timeseries against the pandas reference.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'points':>10}{'pandas s':>14}{'numpy s':>14}{'speedup':>10}{'10 periods s':>14}  identical")
+    for n in args.sizes:
+        same = all(identical(calculate_stats_for_timeseries_pandas(frame.copy()), utils.calculate_stats_for_timeseries(frame.copy()))
+                   for frame in (make_series(n, kind=kind) for kind in SERIES_KINDS))
+        df = make_series(n)
+        reference = median_seconds(calculate_stats_for_timeseries_pandas, df, args.repeats)
+        vectorized = median_seconds(utils.calculate_stats_for_timeseries, df, args.repeats)
+        ten_periods = median_seconds(lambda frame: utils.calculate_stats_for_timeseries(frame, TEN_PERIODS), df, args.repeats)
+        print(f"{n:>10}{reference:>14.6f}{vectorized:>14.6f}{reference / vectorized:>9.1f}x{ten_periods:>14.6f}  {same}")
@@ -0,0 +1,114 @@
+"""
+Cache of decoded raster blocks.
+
+Reading a 1x1 window makes GDAL decompress the whole internal tile or strip
+the pixel lies in and throw the rest away. This cache keeps decoded blocks,
+keyed by (file, mtime, band, block row, block col), within a memory budget,
+so later lookups in the same block (neighbouring clicks, batch points, the
+next request in the same area) are served from memory.
+
+Usage:
+    with handle_pool.open_handle(path) as handle:
+        value = block_cache.get_cache().read_pixel(handle, row, col)
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class BlockCache:
+    """Thread-safe LRU cache of decoded raster blocks with a memory budget in bytes."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_block(self, handle, band: int, block_row: int, block_col: int) -> np.ndarray:
+        """Returns a decoded block, reading it through the handle's dataset on a miss."""
+        key = (handle.path, handle.mtime, band, block_row, block_col)
+
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is not None:
+                self._blocks.move_to_end(key)
+                self.hits += 1
+                return block
+            self.misses += 1
+
+        window = handle.dataset.block_window(band, block_row, block_col)
+        block = handle.dataset.read(band, window=window)
+
+        with self._lock:
+            if key not in self._blocks and block.nbytes <= self.max_bytes:
+                self._blocks[key] = block
+                self.size += block.nbytes
+                while self.size > self.max_bytes:
+                    _, evicted = self._blocks.popitem(last=False)
+                    self.size -= evicted.nbytes
+        return block
+
+    def read_pixel(self, handle, row: int, col: int, band: int = 1):
+        """Returns the value of one pixel of a pooled handle (see handle_pool.open_handle)."""
+        block_height, block_width = handle.dataset.block_shapes[band - 1]
+        block = self._get_block(handle, band, row // block_height, col // block_width)
+        return block[row % block_height, col % block_width]
+
+    def read_pixels(self, handle, rows, cols, band: int = 1) -> np.ndarray:
+        """Returns the values of many pixels, reading every block they fall into once."""
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        block_height, block_width = handle.dataset.block_shapes[band - 1]
+        block_rows = rows // block_height
+        block_cols = cols // block_width
+
+        values = np.empty(len(rows), dtype=handle.dataset.dtypes[band - 1])
+        for block_row, block_col in set(zip(block_rows.tolist(), block_cols.tolist())):
+            in_block = (block_rows == block_row) & (block_cols == block_col)
+            block = self._get_block(handle, band, block_row, block_col)
+            values[in_block] = block[rows[in_block] % block_height, cols[in_block] % block_width]
+        return values
+
+    def resize(self, max_bytes: int):
+        with self._lock:
+            self.max_bytes = max_bytes
+            while self.size > self.max_bytes:
+                _, evicted = self._blocks.popitem(last=False)
+                self.size -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'blocks': len(self._blocks),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+            }
+
+
+_cache = BlockCache()
+
+
+def get_cache() -> BlockCache:
+    """Returns the process-wide block cache."""
+    return _cache
+
+
+def configure(max_bytes: int = DEFAULT_MAX_BYTES):
+    """Sets the memory budget of the process-wide block cache."""
+    _cache.resize(max_bytes)
@@ -0,0 +1,179 @@
+"""
+Rewrite datahub GeoTIFF directories as tiled, compressed Cloud-Optimized GeoTIFFs
+and benchmark the point-read cost of both layouts.
+
+The cost of a point read depends on the file layout: a 1x1 window still makes
+GDAL read and decode the whole strip or tile around the pixel. The convert
+command writes a dataset/variable directory below GSA_DATAHUB_ROOT as COGs with
+a configurable block size, compression and predictor, and checks that the
+values of every file are preserved bit for bit. The benchmark command runs
+the existing process_geotiffs path on the source and the converted tree and
+reports bytes read and latency per point extraction::
+
+    python cog_convert.py convert spartacus-v2-1d-1km TM --output-root /data/cog --block-size 256
+    python cog_convert.py benchmark spartacus-v2-1d-1km TM --output-root /data/cog
+
+Bytes read are taken from /proc/self/io (rchar), so the benchmark is Linux only.
+"""
+
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import rasterio
+import rasterio.shutil
+
+import utils
+import processors
+import handle_pool
+import block_cache
+
+DEFAULT_POINTS = ((47.0, 15.0), (48.2, 16.37), (47.27, 11.39), (46.62, 14.31))
+
+
+def convert_file(src_path: str, dst_path: str, block_size: int = 256, compress: str = 'DEFLATE',
+                 predictor: str = 'YES', overviews: str = 'NONE') -> dict:
+    """
+    Writes one GeoTIFF as a Cloud-Optimized GeoTIFF and verifies its values.
+
+    Returns:
+        dict: Source and destination path and size in bytes.
+
+    Raises:
+        ValueError: If the values, dtype or nodata of the written file differ from the source.
+    """
+    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+    tmp_path = f"{dst_path}.tmp.tif"
+
+    rasterio.shutil.copy(src_path, tmp_path, driver='COG', BLOCKSIZE=block_size, COMPRESS=compress,
+                         PREDICTOR=predictor, OVERVIEWS=overviews)
+
+    verify_identical(src_path, tmp_path)
+    os.replace(tmp_path, dst_path)
+
+    return {'src': src_path, 'dst': dst_path, 'src_bytes': os.path.getsize(src_path), 'dst_bytes': os.path.getsize(dst_path)}
+
+
+def _same_nodata(a, b) -> bool:
+    """Compares two nodata values, NaN nodata being equal to NaN nodata."""
+    return a == b or (a is not None and b is not None and math.isnan(a) and math.isnan(b))
+
+
+def verify_identical(src_path: str, dst_path: str):
+    """Checks that two rasters hold bit-identical bands with the same dtype, nodata and geometry."""
+    with rasterio.open(src_path) as src, rasterio.open(dst_path) as dst:
+        if (src.count, src.dtypes, src.shape, src.transform) != (dst.count, dst.dtypes, dst.shape, dst.transform):
+            raise ValueError(f"Raster properties of {dst_path} differ from {src_path}")
+        if not _same_nodata(src.nodata, dst.nodata):
+            raise ValueError(f"Nodata value {dst.nodata} of {dst_path} differs from {src.nodata} of {src_path}")
+        for band in range(1, src.count + 1):
+            # Compare the raw bytes so that NaN payloads and -0.0 are checked too
+            if src.read(band).tobytes() != dst.read(band).tobytes():
+                raise ValueError(f"Values of band {band} of {dst_path} differ from {src_path}")
+
+
+def convert_directory(src_dir: str, dst_dir: str, jobs: int = 4, **options) -> list:
+    """Converts all GeoTIFFs of a directory in parallel worker processes."""
+    src_paths = sorted(utils.list_files_with_extension(src_dir, '.tif'))
+    dst_paths = [os.path.join(dst_dir, utils.basename(path)) for path in src_paths]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(convert_file, src, dst, **options) for src, dst in zip(src_paths, dst_paths)]
+        return [future.result() for future in futures]
+
+
+def _read_bytes() -> int:
+    with open('/proc/self/io') as f:
+        for line in f:
+            if line.startswith('rchar:'):
+                return int(line.split()[1])
+    return 0
+
+
+def benchmark_directory(data_dir: str, points: tuple, threads: int = 4, month: int = None, day: int = None) -> dict:
+    """
+    Runs process_geotiffs of the threading processor for every point on a directory.
+
+    The handle pool and block cache are cleared before every point, so each
+    extraction pays for opening and decoding like a cold request.
+
+    Returns:
+        dict: Number of files, bytes read and seconds per point extraction, and bytes read per file read.
+    """
+    processor = processors.GeoTIFFThreadingProcessor(data_dir, month=month, day=day, threads=threads)
+    n_files = len(processor.list_files_with_extension(data_dir, '.tif'))
+
+    total_bytes = 0
+    total_seconds = 0.0
+    for lat, lng in points:
+        handle_pool.get_pool().clear()
+        block_cache.get_cache().clear()
+
+        bytes_before = _read_bytes()
+        start_time = time.perf_counter()
+        processor.process_geotiffs('.tif', lat, lng)
+        total_seconds += time.perf_counter() - start_time
+        total_bytes += _read_bytes() - bytes_before
+
+    return {
+        'files': n_files,
+        'bytes_per_point': total_bytes / len(points),
+        'seconds_per_point': total_seconds / len(points),
+        'bytes_per_file_read': total_bytes / (len(points) * n_files) if n_files else 0,
+    }
+
+
+def _format_report(source: dict, converted: dict) -> str:
+    lines = [f"{'':24}{'source':>16}{'cog':>16}{'change':>10}"]
+    for key in ('files', 'bytes_per_point', 'bytes_per_file_read', 'seconds_per_point'):
+        change = f"{converted[key] / source[key]:.2f}x" if source[key] else '-'
+        lines.append(f"{key:24}{source[key]:>16.4f}{converted[key]:>16.4f}{change:>10}")
+    return "\n".join(lines)
+
+
+def _parse_point(value: str) -> tuple:
+    lat, lng = value.split(',')
+    return float(lat), float(lng)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert datahub GeoTIFFs to COG and benchmark point reads.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for name in ('convert', 'benchmark'):
+        subparser = subparsers.add_parser(name)
+        subparser.add_argument('dataset', help="Dataset directory below GSA_DATAHUB_ROOT, e.g. 'spartacus-v2-1d-1km'.")
+        subparser.add_argument('variable', help="Variable directory, e.g. 'TM'.")
+        subparser.add_argument('--output-root', required=True, help="Root of the converted tree.")
+
+    convert_parser = subparsers.choices['convert']
+    convert_parser.add_argument('--block-size', type=int, default=256)
+    convert_parser.add_argument('--compress', default='DEFLATE', help="COG COMPRESS option, e.g. DEFLATE, ZSTD, LZW, NONE.")
+    convert_parser.add_argument('--predictor', default='YES', help="COG PREDICTOR option: YES, NO, STANDARD or FLOATING_POINT.")
+    convert_parser.add_argument('--overviews', default='NONE', help="COG OVERVIEWS option; point reads never use overviews.")
+    convert_parser.add_argument('--jobs', type=int, default=4)
+
+    benchmark_parser = subparsers.choices['benchmark']
+    benchmark_parser.add_argument('--points', type=_parse_point, nargs='+', default=list(DEFAULT_POINTS),
+                                  help="Points as lat,lng.")
+    benchmark_parser.add_argument('--threads', type=int, default=4)
+    benchmark_parser.add_argument('--month', type=int, default=None)
+    benchmark_parser.add_argument('--day', type=int, default=None)
+
+    args = parser.parse_args()
+
+    src_dir = os.path.join(utils.GSA_DATAHUB_ROOT, args.dataset.strip('/'), args.variable)
+    dst_dir = os.path.join(args.output_root, args.dataset.strip('/'), args.variable)
+
+    if args.command == 'convert':
+        converted = convert_directory(src_dir, dst_dir, jobs=args.jobs, block_size=args.block_size,
+                                      compress=args.compress, predictor=args.predictor, overviews=args.overviews)
+        src_bytes = sum(item['src_bytes'] for item in converted)
+        dst_bytes = sum(item['dst_bytes'] for item in converted)
+        print(f"Converted and verified {len(converted)} files: {src_bytes / 1e6:.1f} MB -> {dst_bytes / 1e6:.1f} MB")
+    elif args.command == 'benchmark':
+        source = benchmark_directory(src_dir, args.points, args.threads, args.month, args.day)
+        converted = benchmark_directory(dst_dir, args.points, args.threads, args.month, args.day)
+        print(_format_report(source, converted))
@@ -0,0 +1,331 @@
+"""
+Time-major point cube store for GeoTIFF datasets.
+
+A point cube holds every time step of one ``<dataset>/<variable>`` directory of
+the datahub as a single (time, y, x) array that is split into chunks along the
+time axis. Each chunk is a ``.npy`` file laid out as (y, x, time) so that the
+values of one pixel are contiguous on disk and a point time series is read as
+one slice per chunk from a memory map.
+
+Store layout::
+
+    <store_dir>/meta.json              grid geometry, dtype, nodata, generation and chunk list
+    <store_dir>/time_index.json        source filenames and datetimes of the time axis
+    <store_dir>/chunk_000000_g0.npy    (y, x, time) values of time steps 0..chunk_size-1
+    ...
+
+Build a store, and append newly delivered files to it later, with::
+
+    python cube_store.py build spartacus-v2-1d-1km TM
+    python cube_store.py ingest spartacus-v2-1d-1km TM
+"""
+
+import argparse
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import rasterio
+from rasterio.transform import Affine, rowcol
+
+import utils
+
+META_FILENAME = "meta.json"
+TIME_INDEX_FILENAME = "time_index.json"
+DEFAULT_CHUNK_SIZE = 256
+
+_open_stores = {}
+_open_stores_lock = threading.Lock()
+
+
+class PointCubeStore:
+    """Read access to a point cube store through memory-mapped chunks."""
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+
+        with open(os.path.join(store_dir, META_FILENAME)) as f:
+            self.meta = json.load(f)
+        with open(os.path.join(store_dir, self.meta['time_index'])) as f:
+            time_index = json.load(f)
+
+        self.files = time_index['files']
+        self.datetimes = time_index['datetimes']
+        self.height = self.meta['height']
+        self.width = self.meta['width']
+        self.nodata = self.meta['nodata']
+        self.transform = Affine(*self.meta['transform'])
+        self.chunks = [np.load(os.path.join(store_dir, chunk['file']), mmap_mode='r')
+                       for chunk in self.meta['chunks']]
+
+    @staticmethod
+    def exists(store_dir: str) -> bool:
+        """Checks whether a built store is present in the given directory."""
+        return os.path.isfile(os.path.join(store_dir, META_FILENAME))
+
+    def index(self, x: float, y: float):
+        """Returns the (row, col) of the cell containing the projected coordinates, or None if outside the grid."""
+        row, col = rowcol(self.transform, x, y)
+        if not (0 <= row < self.height and 0 <= col < self.width):
+            return None
+        return row, col
+
+    def read_point(self, row: int, col: int) -> np.ndarray:
+        """Returns the full time series of one pixel, ordered like the time index."""
+        if not self.chunks:
+            return np.empty(0, dtype=self.meta['dtype'])
+        return np.concatenate([chunk[row, col, :] for chunk in self.chunks])
+
+    def read_points(self, rows, cols) -> np.ndarray:
+        """Returns the time series of many pixels as a (points, time) array."""
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        if not self.chunks:
+            return np.empty((len(rows), 0), dtype=self.meta['dtype'])
+        return np.concatenate([chunk[rows, cols, :] for chunk in self.chunks], axis=1)
+
+
+def open_point_cube(store_dir: str) -> PointCubeStore:
+    """
+    Returns a process-wide shared PointCubeStore for store_dir.
+
+    The store is reopened whenever its meta file has been replaced, so readers
+    pick up rebuilt or appended stores without a restart.
+    """
+    meta_mtime = os.stat(os.path.join(store_dir, META_FILENAME)).st_mtime_ns
+
+    with _open_stores_lock:
+        cached = _open_stores.get(store_dir)
+        if cached is not None and cached[0] == meta_mtime:
+            return cached[1]
+
+        store = PointCubeStore(store_dir)
+        _open_stores[store_dir] = (meta_mtime, store)
+        return store
+
+
+def _sorted_source_files(data_dir: str, extension: str) -> list:
+    """Lists the GeoTIFFs of a data directory ordered by the datetime encoded in their filenames."""
+    file_paths = utils.list_files_with_extension(data_dir, extension)
+    return sorted(file_paths, key=lambda p: (utils.extract_datetime_from_filename(utils.basename(p)), utils.basename(p)))
+
+
+def _chunk_filename(start: int, generation: int) -> str:
+    return f"chunk_{start:06d}_g{generation}.npy"
+
+
+def _write_chunk(store_dir: str, start: int, file_paths: list, meta: dict, existing: np.ndarray = None) -> dict:
+    """
+    Reads the given GeoTIFFs and writes them as one (y, x, time) chunk file.
+
+    If existing is given, its time steps are written first, which is used to
+    fill up the last chunk of a store when appending.
+    """
+    n_existing = existing.shape[2] if existing is not None else 0
+    chunk = np.empty((meta['height'], meta['width'], n_existing + len(file_paths)), dtype=meta['dtype'])
+    if existing is not None:
+        chunk[:, :, :n_existing] = existing
+
+    for i, file_path in enumerate(file_paths, start=n_existing):
+        with rasterio.open(file_path) as src:
+            if (src.height, src.width) != (meta['height'], meta['width']) or list(src.transform)[:6] != meta['transform']:
+                raise ValueError(f"Grid geometry of {file_path} differs from the rest of the dataset.")
+            chunk[:, :, i] = src.read(1)
+
+    chunk_filename = _chunk_filename(start, meta['generation'])
+    np.save(os.path.join(store_dir, chunk_filename), chunk)
+
+    return {'file': chunk_filename, 'start': start, 'length': chunk.shape[2]}
+
+
+def _write_json_atomic(path: str, data: dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _grid_meta_from_file(file_path: str, chunk_size: int) -> dict:
+    """Builds the grid part of the store meta from a reference GeoTIFF."""
+    with rasterio.open(file_path) as src:
+        return {
+            'height': src.height,
+            'width': src.width,
+            'dtype': src.dtypes[0],
+            'nodata': src.nodata,
+            'crs': src.crs.to_string() if src.crs else None,
+            'transform': list(src.transform)[:6],
+            'chunk_size': chunk_size,
+        }
+
+
+def build_point_cube(data_dir: str, store_dir: str, extension: str = '.tif', chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+    """
+    Builds a point cube store from all GeoTIFFs of a data directory.
+
+    The store is written to a temporary directory next to store_dir and moved
+    into place once complete, so readers never see a partially built store.
+
+    Args:
+        data_dir (str): Directory containing the GeoTIFF time steps.
+        store_dir (str): Target directory of the store.
+        extension (str): File extension of the source rasters.
+        chunk_size (int): Number of time steps per chunk file.
+
+    Returns:
+        dict: The meta information of the built store.
+    """
+    file_paths = _sorted_source_files(data_dir, extension)
+    if not file_paths:
+        raise ValueError(f"No {extension} files found in {data_dir}")
+
+    tmp_dir = f"{store_dir.rstrip('/')}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    meta = _grid_meta_from_file(file_paths[0], chunk_size)
+    meta['source_dir'] = data_dir
+    meta['generation'] = 0
+    meta['time_index'] = TIME_INDEX_FILENAME
+    meta['chunks'] = [_write_chunk(tmp_dir, start, file_paths[start:start + chunk_size], meta)
+                      for start in range(0, len(file_paths), chunk_size)]
+
+    time_index = {
+        'files': [utils.basename(p) for p in file_paths],
+        'datetimes': [utils.extract_datetime_from_filename(utils.basename(p)).isoformat() for p in file_paths],
+    }
+    with open(os.path.join(tmp_dir, TIME_INDEX_FILENAME), 'w') as f:
+        json.dump(time_index, f)
+    with open(os.path.join(tmp_dir, META_FILENAME), 'w') as f:
+        json.dump(meta, f)
+
+    old_dir = f"{store_dir.rstrip('/')}.old"
+    if os.path.exists(store_dir):
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.replace(store_dir, old_dir)
+    os.makedirs(os.path.dirname(store_dir.rstrip('/')), exist_ok=True)
+    os.replace(tmp_dir, store_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    return meta
+
+
+def append_point_cube(store_dir: str, data_dir: str = None, extension: str = '.tif') -> int:
+    """
+    Appends the time steps of newly delivered GeoTIFFs to an existing store.
+
+    Files of the data directory that are not in the time index yet are ordered
+    by extract_datetime_from_filename and appended: the last, partially filled
+    chunk is rewritten together with the first new steps and further new steps
+    go to new chunk files. All new files are written under a new generation and
+    the switch happens with one atomic replace of meta.json, so readers see
+    either the old or the new store, never a half-written state. Files of the
+    generation before the previous one are removed, since readers may still
+    hold the previous meta.
+
+    Args:
+        store_dir (str): Directory of an existing store.
+        data_dir (str, optional): Directory of the source GeoTIFFs, defaults to the one the store was built from.
+        extension (str): File extension of the source rasters.
+
+    Returns:
+        int: Number of appended time steps.
+    """
+    with open(os.path.join(store_dir, META_FILENAME)) as f:
+        previous_meta = json.load(f)
+    with open(os.path.join(store_dir, previous_meta['time_index'])) as f:
+        time_index = json.load(f)
+
+    data_dir = data_dir or previous_meta['source_dir']
+    known_files = set(time_index['files'])
+    new_paths = [p for p in _sorted_source_files(data_dir, extension) if utils.basename(p) not in known_files]
+    if not new_paths:
+        return 0
+
+    meta = dict(previous_meta)
+    meta['generation'] = previous_meta.get('generation', 0) + 1
+    meta['time_index'] = f"time_index_g{meta['generation']}.json"
+    chunks = list(previous_meta['chunks'])
+    chunk_size = meta['chunk_size']
+    n_steps = sum(chunk['length'] for chunk in chunks)
+
+    # Fill up the last chunk with the first new steps
+    if chunks and chunks[-1]['length'] < chunk_size:
+        last = chunks.pop()
+        n_fill = chunk_size - last['length']
+        existing = np.load(os.path.join(store_dir, last['file']), mmap_mode='r')
+        chunks.append(_write_chunk(store_dir, last['start'], new_paths[:n_fill], meta, existing=existing))
+        remaining = new_paths[n_fill:]
+    else:
+        remaining = new_paths
+
+    for offset in range(0, len(remaining), chunk_size):
+        start = n_steps + (len(new_paths) - len(remaining)) + offset
+        chunks.append(_write_chunk(store_dir, start, remaining[offset:offset + chunk_size], meta))
+    meta['chunks'] = chunks
+
+    new_time_index = {
+        'files': time_index['files'] + [utils.basename(p) for p in new_paths],
+        'datetimes': time_index['datetimes'] + [utils.extract_datetime_from_filename(utils.basename(p)).isoformat() for p in new_paths],
+    }
+    _write_json_atomic(os.path.join(store_dir, meta['time_index']), new_time_index)
+    _write_json_atomic(os.path.join(store_dir, META_FILENAME), meta)
+
+    # Keep the files of the current and the previous generation
+    referenced = {META_FILENAME, meta['time_index'], previous_meta['time_index']}
+    referenced.update(chunk['file'] for chunk in meta['chunks'])
+    referenced.update(chunk['file'] for chunk in previous_meta['chunks'])
+    for filename in os.listdir(store_dir):
+        if filename not in referenced and not filename.endswith('.tmp'):
+            os.remove(os.path.join(store_dir, filename))
+
+    return len(new_paths)
+
+
+def list_point_cubes(store_root: str = None) -> list:
+    """Lists the directories of all built stores below store_root."""
+    store_root = store_root or utils.GSA_POINTCUBE_ROOT
+    return sorted(dirpath for dirpath, _, filenames in os.walk(store_root) if META_FILENAME in filenames)
+
+
+def point_cube_dir(dataset: str, variable: str, store_root: str = None) -> str:
+    """Returns the store directory of a dataset/variable combination."""
+    store_root = store_root or utils.GSA_POINTCUBE_ROOT
+    return os.path.join(store_root, dataset.strip('/'), variable)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build time-major point cube stores from datahub GeoTIFF directories.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="Build (or rebuild) the store of one dataset/variable.")
+    build_parser.add_argument('dataset', help="Dataset directory below GSA_DATAHUB_ROOT, e.g. 'spartacus-v2-1d-1km' or 'climate_data/spartacus-v2-1m-1km'.")
+    build_parser.add_argument('variable', help="Variable directory, e.g. 'TM'.")
+    build_parser.add_argument('--store-root', default=utils.GSA_POINTCUBE_ROOT)
+    build_parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    ingest_parser = subparsers.add_parser('ingest', help="Append newly delivered time steps to existing stores.")
+    ingest_parser.add_argument('dataset', nargs='?', help="Dataset directory below GSA_DATAHUB_ROOT; all stores if omitted.")
+    ingest_parser.add_argument('variable', nargs='?', help="Variable directory, e.g. 'TM'.")
+    ingest_parser.add_argument('--store-root', default=utils.GSA_POINTCUBE_ROOT)
+
+    args = parser.parse_args()
+
+    if args.command == 'ingest':
+        if args.dataset and args.variable:
+            store_dirs = [point_cube_dir(args.dataset, args.variable, args.store_root)]
+        else:
+            store_dirs = list_point_cubes(args.store_root)
+        for store_dir in store_dirs:
+            n_appended = append_point_cube(store_dir)
+            print(f"{store_dir}: appended {n_appended} time steps.")
+    elif args.command == 'build':
+        data_dir = os.path.join(utils.GSA_DATAHUB_ROOT, args.dataset.strip('/'), args.variable)
+        store_dir = point_cube_dir(args.dataset, args.variable, args.store_root)
+        meta = build_point_cube(data_dir, store_dir, chunk_size=args.chunk_size)
+        n_steps = sum(chunk['length'] for chunk in meta['chunks'])
+        print(f"Built point cube {store_dir} with {n_steps} time steps in {len(meta['chunks'])} chunks.")
@@ -0,0 +1,90 @@
+"""
+Memory-resident digital elevation model.
+
+Every /gridTimeseries request used to create a processor, and with it a new
+pyproj Transformer, and open the DEM GeoTIFF to read a single pixel. The DEM
+band is now loaded once per process together with its grid geometry, and
+altitude lookups are vectorized: points are transformed to EPSG:31287 with
+the cached per-thread Transformer and resolved to rows and cols of the
+in-memory array, so a lookup is an array index instead of a file open. The
+DEM is reloaded when the mtime of its file changes.
+
+Usage:
+    altitudes = dem.get_dem().altitudes(lats, lngs)
+"""
+
+import os
+import threading
+
+import numpy as np
+import rasterio
+
+import utils
+import grid_geometry
+
+DEM_RELATIVE_PATH = os.path.join('dem', 'output_COP90_31287.tif')
+
+_dem = None
+_dem_lock = threading.Lock()
+
+
+def default_dem_path() -> str:
+    return os.path.join(utils.GSA_DATAHUB_ROOT, DEM_RELATIVE_PATH)
+
+
+class DigitalElevationModel:
+    """Band 1 of a DEM GeoTIFF held in memory with its grid geometry."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = os.stat(path).st_mtime_ns
+        with rasterio.open(path) as src:
+            self.data = src.read(1)
+            self.nodata = src.nodata
+            self.geometry = grid_geometry.GridGeometry.from_dataset(src, path)
+
+    def lookup(self, lats, lngs) -> tuple:
+        """
+        Looks up the raw DEM values of WGS84 points.
+
+        Returns:
+            tuple: (values, inside) arrays in the dtype of the DEM; values are only valid where inside is True.
+        """
+        xs, ys = grid_geometry.transform_lnglat(np.asarray(lngs, dtype=float), np.asarray(lats, dtype=float))
+        rows, cols, inside = self.geometry.index_many(xs, ys)
+        return self.data[rows, cols], inside
+
+    def altitudes(self, lats, lngs) -> np.ndarray:
+        """
+        Returns the altitudes of WGS84 points as float64, NaN for points outside the DEM or on nodata pixels.
+        """
+        values, inside = self.lookup(lats, lngs)
+        altitudes = values.astype(np.float64)
+        invalid = ~inside
+        if self.nodata is not None:
+            invalid |= values == self.nodata
+        altitudes[invalid] = np.nan
+        return altitudes
+
+    def altitude(self, lat: float, lng: float):
+        """Returns the altitude of one point, or NaN (see altitudes)."""
+        return self.altitudes([lat], [lng])[0]
+
+
+def get_dem(path: str = None):
+    """
+    Returns the process-wide DEM, loading it on first use and again when its file changed,
+    or None if the DEM file does not exist.
+    """
+    global _dem
+
+    path = path or default_dem_path()
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    with _dem_lock:
+        if _dem is None or _dem.path != path or _dem.mtime != mtime:
+            _dem = DigitalElevationModel(path)
+        return _dem
@@ -0,0 +1,183 @@
+"""
+Per-dataset extraction engine profiles.
+
+The best extraction engine and parallelism depend on the dataset (a few
+hundred yearly files or tens of thousands of daily ones) and on the storage
+it lives on. The calibration command benchmarks the threading, process and
+async engines on the actual files of a dataset and saves the fastest setup::
+
+    python engine_profile.py calibrate spartacus-v2-1d-1km TM
+    python engine_profile.py calibrate climate_data/spartacus-v2-1m-1km TM --workers 2 4 8
+
+utils.create_processor looks up the saved profile of a dataset and falls back
+to the configured engine for datasets that have not been calibrated.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from datetime import datetime
+
+import utils
+import processors
+import handle_pool
+import block_cache
+
+PROFILE_FILENAME = "engine_profile.json"
+DEFAULT_WORKERS = (2, 4, 8, 16)
+DEFAULT_CHUNK_SIZES = (16, 64)
+
+_profiles = None
+_profiles_mtime = None
+_profiles_lock = threading.Lock()
+
+
+def profile_path() -> str:
+    return os.path.join(utils.GSA_DATAHUB_ROOT, PROFILE_FILENAME)
+
+
+def profile_key(dataset: str) -> str:
+    """Normalizes a dataset name ('/climate_data/x' and 'climate_data/x' are the same dataset)."""
+    return dataset.strip('/')
+
+
+def load_profiles(path: str = None) -> dict:
+    """Loads the saved profiles, reloading the file only when it changed."""
+    global _profiles, _profiles_mtime
+
+    path = path or profile_path()
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+
+    with _profiles_lock:
+        if _profiles is None or _profiles_mtime != mtime:
+            with open(path) as f:
+                _profiles = json.load(f)
+            _profiles_mtime = mtime
+        return _profiles
+
+
+def lookup(dataset: str):
+    """Returns the saved profile of a dataset, or None if it has not been calibrated."""
+    return load_profiles().get(profile_key(dataset))
+
+
+def max_workers(engine: str) -> int:
+    """Returns the largest number of workers of the saved profiles of an engine, 0 if there are none."""
+    return max((profile.get('workers', 0) for profile in load_profiles().values() if profile.get('engine') == engine), default=0)
+
+
+def save_profile(dataset: str, profile: dict, path: str = None):
+    """Stores the profile of one dataset, replacing the profile file atomically."""
+    path = path or profile_path()
+    profiles = dict(load_profiles(path))
+    profiles[profile_key(dataset)] = profile
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(profiles, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _candidate_processors(data_dir: str, date_filter: dict, workers: tuple, chunk_sizes: tuple, async_workers: int):
+    """
+    Yields (setup, processor) for every engine/parallelism combination to benchmark.
+
+    The async candidates are capped at async_workers, the size of the executor
+    the async engine shares between requests, as it never runs more reads at once.
+    """
+    for n in sorted({min(n, async_workers) for n in workers}):
+        yield ({'engine': 'async', 'workers': n},
+               processors.AsyncGeoTIFFProcessor(data_dir, max_workers=n, **date_filter))
+    for n in workers:
+        yield ({'engine': 'threading', 'workers': n},
+               processors.GeoTIFFThreadingProcessor(data_dir, threads=n, **date_filter))
+        for chunk_size in chunk_sizes:
+            yield ({'engine': 'process', 'workers': n, 'chunk_size': chunk_size},
+                   processors.GeoTIFFProcessPoolProcessor(data_dir, workers=n, chunk_size=chunk_size, **date_filter))
+
+
+def calibrate_dataset(dataset: str, variable: str, lat: float, lng: float, workers: tuple = DEFAULT_WORKERS,
+                      chunk_sizes: tuple = DEFAULT_CHUNK_SIZES, repeats: int = 3, async_workers: int = 8) -> dict:
+    """
+    Benchmarks all engines on one dataset and returns the fastest setup.
+
+    Every setup gets one warm-up run and is then timed repeats times; the
+    median wall time is compared. The handle pools and block caches of this
+    process and of the process engine's workers are cleared before every
+    timed run, so each run opens and decodes the files like a cold request
+    instead of being answered from the blocks of the previous run. Daily and monthly datasets are benchmarked
+    with the day/month filter the API applies, so the number of files matches
+    a real request. async_workers is the ASYNC_EXTRACTION_WORKERS of the API,
+    the size of the async engine's shared executor.
+
+    Returns:
+        dict: The best setup (engine, workers and chunk_size) together with the
+        timings of all setups and the calibration time.
+    """
+    data_dir = f"{utils.GSA_DATAHUB_ROOT}/{dataset}/{variable}"
+    category = utils.extract_date_category_from_dataset_name(dataset)
+    date_filter = {'d': {'day': 1}, 'm': {'month': 1}}.get(category, {})
+
+    # Like the API, one process pool serves all process setups, sized for the largest one
+    processors.configure_process_engine(max(workers))
+    async_workers = processors.get_async_engine(async_workers).max_workers
+
+    timings = []
+    for setup, processor in _candidate_processors(data_dir, date_filter, workers, chunk_sizes, async_workers):
+        processor.process_geotiffs('.tif', lat, lng)
+
+        durations = []
+        for _ in range(repeats):
+            handle_pool.get_pool().clear()
+            block_cache.get_cache().clear()
+            processors.clear_process_engine_caches()
+            start_time = time.perf_counter()
+            processor.process_geotiffs('.tif', lat, lng)
+            durations.append(time.perf_counter() - start_time)
+
+        timings.append({**setup, 'seconds': statistics.median(durations)})
+        print(f"{dataset}/{variable} {setup}: {timings[-1]['seconds']:.4f} s")
+
+    best = min(timings, key=lambda timing: timing['seconds'])
+    profile = {key: value for key, value in best.items() if key != 'seconds'}
+    profile['seconds'] = best['seconds']
+    profile['variable'] = variable
+    profile['timings'] = timings
+    profile['calibrated_at'] = datetime.now().isoformat(timespec='seconds')
+
+    return profile
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the extraction engines per dataset and save the fastest setup.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    calibrate_parser = subparsers.add_parser('calibrate', help="Calibrate one dataset.")
+    calibrate_parser.add_argument('dataset', help="Dataset directory below GSA_DATAHUB_ROOT, e.g. 'spartacus-v2-1d-1km'.")
+    calibrate_parser.add_argument('variable', help="Variable directory used for the benchmark, e.g. 'TM'.")
+    calibrate_parser.add_argument('--lat', type=float, default=47.5)
+    calibrate_parser.add_argument('--lng', type=float, default=14.0)
+    calibrate_parser.add_argument('--workers', type=int, nargs='+', default=list(DEFAULT_WORKERS))
+    calibrate_parser.add_argument('--chunk-sizes', type=int, nargs='+', default=list(DEFAULT_CHUNK_SIZES))
+    calibrate_parser.add_argument('--repeats', type=int, default=3)
+    calibrate_parser.add_argument('--async-workers', type=int, default=8,
+                                  help="ASYNC_EXTRACTION_WORKERS of the API; async setups are capped at it.")
+
+    subparsers.add_parser('show', help="Print the saved profiles.")
+
+    args = parser.parse_args()
+
+    if args.command == 'calibrate':
+        profile = calibrate_dataset(args.dataset, args.variable, args.lat, args.lng, tuple(args.workers),
+                                    tuple(args.chunk_sizes), args.repeats, args.async_workers)
+        save_profile(args.dataset, profile)
+        print(f"Saved profile for {profile_key(args.dataset)}: {profile['engine']} with {profile['workers']} workers "
+              f"({profile['seconds']:.4f} s)")
+    elif args.command == 'show':
+        print(json.dumps(load_profiles(), indent=2))
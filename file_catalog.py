@@ -0,0 +1,285 @@
+"""
+Persistent catalog of the GeoTIFF files in the datahub tree.
+
+The catalog is an SQLite database that holds one row per GeoTIFF with its
+dataset, variable, parsed datetime, year, month, day, climate period and CLIM
+flag, indexed on the columns requests filter by. It is built and refreshed by
+the scanner CLI::
+
+    python file_catalog.py scan
+
+Rescans are incremental: the files of a variable directory whose mtime has
+not changed since the last scan are not synced again; only its
+subdirectories are listed and checked in turn. At request time a directory is
+served from the catalog only while its mtime still matches the scanned one,
+otherwise callers fall back to globbing the directory.
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import threading
+
+import utils
+import processors
+
+CATALOG_FILENAME = "file_catalog.sqlite"
+CLIMATE_PERIOD_PATTERN = re.compile(r"_(\d{4}_\d{4})\.[^.]+$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS directories (
+    directory TEXT PRIMARY KEY,
+    dataset TEXT NOT NULL,
+    variable TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    dataset TEXT NOT NULL,
+    variable TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    extension TEXT NOT NULL,
+    datetime TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    climate_period TEXT,
+    is_clim INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_directory_month_day ON files (directory, month, day);
+CREATE INDEX IF NOT EXISTS idx_files_directory_datetime ON files (directory, datetime);
+CREATE INDEX IF NOT EXISTS idx_files_dataset_variable_datetime ON files (dataset, variable, datetime);
+CREATE INDEX IF NOT EXISTS idx_files_dataset_variable_period ON files (dataset, variable, climate_period, is_clim);
+CREATE INDEX IF NOT EXISTS idx_files_year ON files (year);
+"""
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def parse_datetime(filename: str):
+    """Returns the datetime encoded in a datahub GeoTIFF filename."""
+    return utils.extract_datetime_from_filename(filename)
+
+
+def parse_climate_period(filename: str):
+    """Returns the climate period (e.g. '1991_2020') of a CLIM filename, or None for other files."""
+    match = CLIMATE_PERIOD_PATTERN.search(filename)
+    return match.group(1) if ("CLIM" in filename and match) else None
+
+
+def parse_filename(filename: str) -> dict:
+    """
+    Parses the catalog attributes from a datahub GeoTIFF filename.
+
+    Args:
+        filename (str): Filename like "SPARTACUS2-MONTHLY_TM_2025_CLIM_20250101T000000_1991_2020.tif".
+
+    Returns:
+        dict: datetime (ISO string), year, month, day, climate_period (or None) and is_clim.
+
+    Raises:
+        ValueError: If the datetime cannot be extracted from the filename.
+    """
+    dt = parse_datetime(filename)
+    month, day = processors.BaseGeoTIFFProcessor.parse_month_day_from_filename(filename)
+
+    return {
+        'datetime': dt.isoformat(sep=' '),
+        'year': dt.year,
+        'month': month,
+        'day': day,
+        'climate_period': parse_climate_period(filename),
+        'is_clim': int("CLIM" in filename),
+    }
+
+
+class FileCatalog:
+    """SQLite backed catalog of datahub GeoTIFFs with one connection per thread."""
+
+    def __init__(self, db_path: str, root: str = None):
+        self.db_path = db_path
+        self.root = os.path.normpath(root or utils.GSA_DATAHUB_ROOT)
+        self._local = threading.local()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            self._local.connection = conn
+        return conn
+
+    def create_schema(self):
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+
+    def _split_directory(self, directory: str) -> tuple:
+        """Returns (dataset, variable) of a variable directory relative to the datahub root."""
+        rel = os.path.relpath(directory, self.root)
+        dataset, variable = os.path.split(rel)
+        return dataset, variable
+
+    def _sync_directory(self, directory: str, mtime_ns: int, filenames: list) -> tuple:
+        """Brings the rows of one directory in line with its current listing. Returns (added, removed)."""
+        conn = self.connection
+        dataset, variable = self._split_directory(directory)
+
+        known = {row[0] for row in conn.execute("SELECT filename FROM files WHERE directory = ?", (directory,))}
+        current = set(filenames)
+
+        removed = known - current
+        conn.executemany("DELETE FROM files WHERE path = ?",
+                         [(os.path.join(directory, filename),) for filename in removed])
+
+        rows = []
+        for filename in current - known:
+            try:
+                attrs = parse_filename(filename)
+            except ValueError:
+                # Files without a datetime (e.g. the DEM) are not part of any time series
+                continue
+            rows.append((os.path.join(directory, filename), directory, dataset, variable, filename,
+                         os.path.splitext(filename)[1], attrs['datetime'], attrs['year'], attrs['month'],
+                         attrs['day'], attrs['climate_period'], attrs['is_clim']))
+        conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+        conn.execute("INSERT OR REPLACE INTO directories VALUES (?, ?, ?, ?)", (directory, dataset, variable, mtime_ns))
+        conn.commit()
+
+        return len(rows), len(removed)
+
+    def scan(self, extension: str = '.tif') -> dict:
+        """
+        Incrementally rescans the datahub tree.
+
+        Directories are walked from the root; the files of a known variable
+        directory whose mtime is unchanged are not synced again. Its
+        subdirectories are still walked, as a directory's mtime does not change
+        when files change inside its children. Directories that disappeared are
+        removed from the catalog.
+
+        Returns:
+            dict: Counts of scanned and skipped directories and added and removed files.
+        """
+        self.create_schema()
+        known_mtimes = dict(self.connection.execute("SELECT directory, mtime_ns FROM directories"))
+        summary = {'scanned': 0, 'skipped': 0, 'added': 0, 'removed': 0}
+        seen = set()
+
+        stack = [self.root]
+        while stack:
+            directory = stack.pop()
+            mtime_ns = os.stat(directory).st_mtime_ns
+            unchanged = known_mtimes.get(directory) == mtime_ns
+
+            filenames = []
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(os.path.normpath(entry.path))
+                    elif not unchanged and entry.name.endswith(extension):
+                        filenames.append(entry.name)
+
+            if unchanged:
+                seen.add(directory)
+                summary['skipped'] += 1
+                continue
+
+            if filenames or directory in known_mtimes:
+                added, removed = self._sync_directory(directory, mtime_ns, filenames)
+                seen.add(directory)
+                summary['scanned'] += 1
+                summary['added'] += added
+                summary['removed'] += removed
+
+        for directory in set(known_mtimes) - seen:
+            summary['removed'] += self.connection.execute("DELETE FROM files WHERE directory = ?", (directory,)).rowcount
+            self.connection.execute("DELETE FROM directories WHERE directory = ?", (directory,))
+        self.connection.commit()
+
+        return summary
+
+    def is_current(self, directory: str) -> bool:
+        """Checks whether the catalog entry of a directory matches its current mtime."""
+        directory = os.path.normpath(directory)
+        row = self.connection.execute("SELECT mtime_ns FROM directories WHERE directory = ?", (directory,)).fetchone()
+        if row is None:
+            return False
+        try:
+            return os.stat(directory).st_mtime_ns == row[0]
+        except FileNotFoundError:
+            return False
+
+    def list_files(self, directory: str, extension: str, month: int = None, day: int = None, climate_period: str = None,
+                   start=None, end=None):
+        """
+        Lists the files of a directory from the catalog, filtered in SQL.
+
+        start and end are an inclusive datetime range on the datetimes parsed from the filenames.
+
+        Returns:
+            list or None: Paths ordered by datetime, or None if the directory is
+            not in the catalog or changed since the last scan.
+        """
+        directory = os.path.normpath(directory)
+        if not self.is_current(directory):
+            return None
+
+        query = "SELECT path FROM files WHERE directory = ? AND extension = ?"
+        params = [directory, extension]
+        if month:
+            query += " AND month = ?"
+            params.append(month)
+        if day:
+            query += " AND day = ?"
+            params.append(day)
+        if climate_period is not None:
+            query += " AND climate_period = ?"
+            params.append(climate_period)
+        if start is not None:
+            query += " AND datetime >= ?"
+            params.append(start.isoformat(sep=' '))
+        if end is not None:
+            query += " AND datetime <= ?"
+            params.append(end.isoformat(sep=' '))
+        query += " ORDER BY datetime, filename"
+
+        return [row[0] for row in self.connection.execute(query, params)]
+
+
+def default_catalog_path() -> str:
+    return os.path.join(utils.GSA_DATAHUB_ROOT, CATALOG_FILENAME)
+
+
+def get_catalog():
+    """Returns the process-wide catalog, or None if no catalog database has been built yet."""
+    global _catalog
+
+    with _catalog_lock:
+        if _catalog is None:
+            db_path = default_catalog_path()
+            if not os.path.isfile(db_path):
+                return None
+            _catalog = FileCatalog(db_path)
+        return _catalog
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or incrementally refresh the datahub file catalog.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    scan_parser = subparsers.add_parser('scan', help="Scan the datahub tree and update the catalog.")
+    scan_parser.add_argument('--root', default=utils.GSA_DATAHUB_ROOT)
+    scan_parser.add_argument('--db', default=None, help=f"Catalog database, defaults to <root>/{CATALOG_FILENAME}.")
+
+    args = parser.parse_args()
+
+    if args.command == 'scan':
+        db_path = args.db or os.path.join(args.root, CATALOG_FILENAME)
+        catalog = FileCatalog(db_path, root=args.root)
+        summary = catalog.scan()
+        print(f"Scanned {summary['scanned']} directories ({summary['skipped']} unchanged), "
+              f"{summary['added']} files added, {summary['removed']} removed.")
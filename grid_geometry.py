@@ -0,0 +1,199 @@
+"""
+Registry of the grid geometry shared by the files of one dataset/variable directory.
+
+All GeoTIFFs of a SPARTACUS dataset are on the same grid, so a point only
+has to be transformed and resolved to a (row, col) once per request instead
+of once per file. The geometry of a directory is read from a single reference
+file and cached per process. Points outside the footprint can be rejected
+before any raster of the time series is opened.
+
+The coordinates are always transformed to EPSG:31287, like in the
+processors, so a geometry is described by its grid shape and transform.
+Files whose shape or transform differ from the reference are flagged and
+read through the slow path that resolves the point per file.
+"""
+
+import logging
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+from pyproj import Transformer
+from rasterio.transform import rowcol
+from rasterio.features import bounds as geometry_bounds, geometry_mask
+from rasterio.windows import Window, from_bounds, transform as window_transform_of
+from rasterio.warp import transform_geom
+
+import handle_pool
+
+logger = logging.getLogger(__name__)
+
+GridCell = namedtuple('GridCell', ['row', 'col', 'geometry'])
+
+_thread_local = threading.local()
+
+
+def get_transformer() -> Transformer:
+    """Returns the WGS84 to EPSG:31287 Transformer of the calling thread, created on first use."""
+    transformer = getattr(_thread_local, 'transformer', None)
+    if transformer is None:
+        transformer = Transformer.from_crs("epsg:4326", "epsg:31287", always_xy=True)
+        _thread_local.transformer = transformer
+    return transformer
+
+
+def transform_lnglat(lng, lat):
+    """Transforms WGS84 lng/lat (scalars or arrays) to EPSG:31287 with a per-thread Transformer."""
+    return get_transformer().transform(lng, lat)
+
+
+def transform_geometry_to_grid(geometry: dict) -> dict:
+    """Transforms a WGS84 GeoJSON geometry to EPSG:31287."""
+    return transform_geom("EPSG:4326", "EPSG:31287", geometry)
+
+
+class GridGeometry:
+    """Shape and affine transform of a raster grid."""
+
+    def __init__(self, width: int, height: int, transform, reference_path: str = None):
+        self.width = width
+        self.height = height
+        self.transform = transform
+        self.reference_path = reference_path
+
+    @classmethod
+    def from_dataset(cls, dataset, reference_path: str = None):
+        return cls(dataset.width, dataset.height, dataset.transform, reference_path)
+
+    @property
+    def bounds(self) -> tuple:
+        """Returns (left, bottom, right, top) of the grid."""
+        left, top = self.transform * (0, 0)
+        right, bottom = self.transform * (self.width, self.height)
+        return min(left, right), min(bottom, top), max(left, right), max(bottom, top)
+
+    def matches(self, dataset) -> bool:
+        """Checks whether an open dataset is on this grid."""
+        return (dataset.width, dataset.height) == (self.width, self.height) and dataset.transform == self.transform
+
+    def index(self, x: float, y: float):
+        """Returns the (row, col) of projected coordinates, or None if they are outside the footprint."""
+        left, bottom, right, top = self.bounds
+        if not (left <= x <= right and bottom <= y <= top):
+            return None
+        row, col = rowcol(self.transform, x, y)
+        # Points exactly on the right/bottom edge belong to the last row/col, like dataset.index
+        return min(row, self.height - 1), min(col, self.width - 1)
+
+    def index_many(self, xs, ys) -> tuple:
+        """
+        Vectorized index for arrays of projected coordinates.
+
+        Returns:
+            tuple: (rows, cols, inside) arrays; rows and cols are only valid where inside is True.
+        """
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        left, bottom, right, top = self.bounds
+        inside = (xs >= left) & (xs <= right) & (ys >= bottom) & (ys <= top)
+        fcols, frows = ~self.transform * (xs, ys)
+        rows = np.clip(np.floor(frows).astype(np.int64), 0, self.height - 1)
+        cols = np.clip(np.floor(fcols).astype(np.int64), 0, self.width - 1)
+        return rows, cols, inside
+
+    def area_mask(self, geometry: dict):
+        """
+        Rasterizes a GeoJSON geometry in EPSG:31287 on this grid.
+
+        Returns:
+            tuple or None: (window, mask) with the window of the grid covering the
+            geometry and a boolean mask of the pixels inside it, or None if the
+            geometry covers no pixel. Pixel centers decide coverage; geometries
+            smaller than a pixel fall back to the touched pixels.
+        """
+        window = from_bounds(*geometry_bounds(geometry), transform=self.transform)
+        col_start = max(int(np.floor(window.col_off)), 0)
+        row_start = max(int(np.floor(window.row_off)), 0)
+        col_stop = min(int(np.ceil(window.col_off + window.width)), self.width)
+        row_stop = min(int(np.ceil(window.row_off + window.height)), self.height)
+        if col_stop <= col_start or row_stop <= row_start:
+            return None
+
+        window = Window(col_start, row_start, col_stop - col_start, row_stop - row_start)
+        out_shape = (row_stop - row_start, col_stop - col_start)
+        window_transform = window_transform_of(window, self.transform)
+        mask = geometry_mask([geometry], out_shape=out_shape, transform=window_transform, invert=True)
+        if not mask.any():
+            mask = geometry_mask([geometry], out_shape=out_shape, transform=window_transform, invert=True, all_touched=True)
+        if not mask.any():
+            return None
+        return window, mask
+
+    def locate(self, lat: float, lng: float):
+        """Resolves a WGS84 point to a GridCell, or None if it is outside the footprint."""
+        x, y = transform_lnglat(lng, lat)
+        cell = self.index(x, y)
+        if cell is None:
+            return None
+        return GridCell(cell[0], cell[1], self)
+
+
+class GridGeometryRegistry:
+    """Process-wide cache of the grid geometry per data directory."""
+
+    def __init__(self):
+        self._geometries = {}
+        self._mismatches = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _find_reference_file(directory: str, extension: str):
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(extension) and entry.is_file():
+                    return entry.path
+        return None
+
+    def get(self, directory: str, extension: str = '.tif'):
+        """
+        Returns the GridGeometry of a data directory, or None if it holds no rasters.
+
+        The geometry is re-read from a reference file when the directory mtime changes.
+        """
+        directory = os.path.normpath(directory)
+        mtime_ns = os.stat(directory).st_mtime_ns
+
+        with self._lock:
+            cached = self._geometries.get(directory)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+
+        reference_path = self._find_reference_file(directory, extension)
+        if reference_path is None:
+            return None
+
+        with handle_pool.open_dataset(reference_path) as dataset:
+            geometry = GridGeometry.from_dataset(dataset, reference_path)
+
+        with self._lock:
+            self._geometries[directory] = (mtime_ns, geometry)
+        return geometry
+
+    def flag_mismatch(self, path: str):
+        """Logs a file whose geometry differs from the reference of its directory, once per file."""
+        directory = os.path.dirname(os.path.normpath(path))
+        with self._lock:
+            flagged = self._mismatches.setdefault(directory, set())
+            if path in flagged:
+                return
+            flagged.add(path)
+        logger.warning(f"Grid geometry of {path} differs from the dataset reference, using per-file lookup.")
+
+
+_registry = GridGeometryRegistry()
+
+
+def get_registry() -> GridGeometryRegistry:
+    """Returns the process-wide geometry registry."""
+    return _registry
@@ -0,0 +1,171 @@
+"""
+Process-wide pool of open rasterio dataset handles.
+
+Opening a GeoTIFF makes GDAL parse the TIFF header and IFDs. The pool keeps
+recently used datasets open in an LRU so that repeated reads of popular
+files skip that work. A handle is reused only while the file's mtime is
+unchanged, and the number of open file descriptors is capped.
+
+GDAL dataset handles must not be used by several threads at once, so each
+pooled handle carries its own lock that is held while it is checked out.
+
+Usage:
+    with handle_pool.open_dataset(path) as dataset:
+        value = dataset.read(1, window=...)
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import rasterio
+
+DEFAULT_MAX_OPEN = 256
+
+
+class _PooledHandle:
+    """An open dataset together with the mtime it was opened at and its usage lock."""
+
+    def __init__(self, path: str, mtime: int):
+        self.path = path
+        self.mtime = mtime
+        self.dataset = None
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def close(self):
+        if self.dataset is not None:
+            self.dataset.close()
+        self.closed = True
+
+
+class RasterHandlePool:
+    """Thread-safe LRU pool of open rasterio datasets with a cap on open handles."""
+
+    def __init__(self, max_open: int = DEFAULT_MAX_OPEN):
+        self.max_open = max_open
+        self._handles = OrderedDict()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _check_pid(self):
+        """Drops handles inherited from a parent process; GDAL handles must not be shared across a fork."""
+        if self._pid != os.getpid():
+            self._handles = OrderedDict()
+            self._pid = os.getpid()
+
+    def _evict(self):
+        """Closes least recently used idle handles until the pool is within its cap. Must hold self._lock."""
+        for path in list(self._handles.keys()):
+            if len(self._handles) <= self.max_open:
+                break
+            entry = self._handles[path]
+            if entry.lock.acquire(blocking=False):
+                del self._handles[path]
+                try:
+                    entry.close()
+                finally:
+                    entry.lock.release()
+
+    def _acquire(self, path: str) -> _PooledHandle:
+        """Returns the pooled handle for path with its lock held, opening the file if needed."""
+        while True:
+            mtime = os.stat(path).st_mtime_ns
+            stale = None
+            opened_here = False
+
+            with self._lock:
+                self._check_pid()
+                entry = self._handles.get(path)
+
+                if entry is not None and entry.mtime != mtime:
+                    stale = self._handles.pop(path)
+                    entry = None
+
+                if entry is None:
+                    entry = _PooledHandle(path, mtime)
+                    entry.lock.acquire()
+                    self._handles[path] = entry
+                    opened_here = True
+                else:
+                    self._handles.move_to_end(path)
+
+            if stale is not None:
+                with stale.lock:
+                    stale.close()
+
+            if opened_here:
+                try:
+                    entry.dataset = rasterio.open(path)
+                except Exception:
+                    with self._lock:
+                        if self._handles.get(path) is entry:
+                            del self._handles[path]
+                    entry.closed = True
+                    entry.lock.release()
+                    raise
+                with self._lock:
+                    self._evict()
+                return entry
+
+            entry.lock.acquire()
+            if not entry.closed:
+                return entry
+            # The handle was evicted or replaced while waiting for it, try again
+            entry.lock.release()
+
+    @contextmanager
+    def dataset(self, path: str):
+        """Context manager yielding an open rasterio dataset for path that is exclusively used by the caller."""
+        with self.handle(path) as entry:
+            yield entry.dataset
+
+    @contextmanager
+    def handle(self, path: str):
+        """Like dataset, but yields the pooled handle with its path, mtime and dataset."""
+        entry = self._acquire(path)
+        try:
+            yield entry
+        finally:
+            entry.lock.release()
+
+    def resize(self, max_open: int):
+        """Changes the cap on open handles, closing idle handles if the pool is above the new cap."""
+        with self._lock:
+            self.max_open = max_open
+            self._evict()
+
+    def clear(self):
+        """Closes all idle handles."""
+        with self._lock:
+            max_open = self.max_open
+            self.max_open = 0
+            self._evict()
+            self.max_open = max_open
+
+    def __len__(self):
+        return len(self._handles)
+
+
+_pool = RasterHandlePool()
+
+
+def get_pool() -> RasterHandlePool:
+    """Returns the process-wide handle pool."""
+    return _pool
+
+
+def configure(max_open: int = DEFAULT_MAX_OPEN):
+    """Sets the cap on open file handles of the process-wide pool."""
+    _pool.resize(max_open)
+
+
+def open_dataset(path: str):
+    """Shortcut for get_pool().dataset(path)."""
+    return _pool.dataset(path)
+
+
+def open_handle(path: str):
+    """Shortcut for get_pool().handle(path)."""
+    return _pool.handle(path)
@@ -0,0 +1,229 @@
+"""
+Typed columnar copies of the geotiff_metrics_timeseries statistics tables.
+
+The statistics CSVs store every idr/iqr/minmax range as a Python tuple
+literal like ``"(1.2, 3.4)"``, so each request used to parse every cell of
+nine columns. The converter writes each CSV as a Parquet file next to it,
+with the ranges split into float ``<column>_lo`` and ``<column>_hi`` columns
+and the datetime stored as a timestamp::
+
+    <statistics_dir>/geotiff_metrics_timeseries.csv       source table
+    <statistics_dir>/geotiff_metrics_timeseries.parquet   typed copy
+
+Convert all tables (only changed ones are rewritten) with::
+
+    python metrics_store.py convert
+
+load_metrics_table reads the Parquet copy while it is at least as new as the
+CSV and otherwise parses the CSV with the same vectorized conversion. The API
+keeps the loaded tables in the process-wide MetricsTableCache, indexed by
+climate period and datetime.
+"""
+
+import argparse
+import glob
+import os
+import threading
+
+import pandas as pd
+
+import utils
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+METRICS_FILENAME = "geotiff_metrics_timeseries.csv"
+# Climate period of the statistics served to requests without a climate period,
+# for tables that hold the statistics of several periods
+DEFAULT_CLIMATE_PERIOD = "1991_2020"
+RANGE_COLUMNS = [f'{prefix}_{suffix}' for suffix in ('full', 'valley', 'mountain') for prefix in ('idr', 'iqr', 'minmax')]
+
+
+def parquet_path(csv_path: str) -> str:
+    return f"{os.path.splitext(csv_path)[0]}.parquet"
+
+
+def parse_metrics_csv(csv_path: str) -> pd.DataFrame:
+    """
+    Reads a statistics CSV and splits its range columns into typed lo/hi columns.
+
+    Returns:
+        pd.DataFrame: The table with a datetime64 'datetime' column and float64
+        '<column>_lo'/'<column>_hi' columns instead of the tuple literal columns.
+    """
+    table = pd.read_csv(csv_path)
+    table['datetime'] = pd.to_datetime(table['datetime'])
+
+    for column in RANGE_COLUMNS:
+        if column not in table:
+            continue
+        # "(lo, hi)" -> two float columns in one vectorized pass instead of literal_eval per cell
+        bounds = table[column].astype(str).str.strip('()[] ').str.split(',', n=1, expand=True)
+        table[f'{column}_lo'] = pd.to_numeric(bounds[0].str.strip(), errors='coerce')
+        table[f'{column}_hi'] = pd.to_numeric(bounds[1].str.strip(), errors='coerce') if bounds.shape[1] > 1 else float('nan')
+        table = table.drop(columns=column)
+
+    return table
+
+
+def convert_metrics_table(csv_path: str) -> str:
+    """
+    Writes the typed Parquet copy of a statistics CSV, replacing an existing copy atomically.
+
+    Returns:
+        str: The path of the Parquet file.
+    """
+    if pq is None:
+        raise ImportError("Writing Parquet statistics tables requires pyarrow")
+
+    table = parse_metrics_csv(csv_path)
+    dst_path = parquet_path(csv_path)
+    tmp_path = f"{dst_path}.tmp"
+    pq.write_table(pa.Table.from_pandas(table, preserve_index=False), tmp_path)
+    os.replace(tmp_path, dst_path)
+    return dst_path
+
+
+def is_current(csv_path: str) -> bool:
+    """Checks whether the Parquet copy of a statistics CSV exists and is not older than the CSV."""
+    try:
+        parquet_mtime = os.stat(parquet_path(csv_path)).st_mtime_ns
+    except FileNotFoundError:
+        return False
+    try:
+        return parquet_mtime >= os.stat(csv_path).st_mtime_ns
+    except FileNotFoundError:
+        return True
+
+
+def load_metrics_table(csv_path: str) -> pd.DataFrame:
+    """
+    Loads a statistics table with typed lo/hi range columns.
+
+    The Parquet copy is read if it is current, otherwise the CSV is parsed.
+    """
+    if pq is not None and is_current(csv_path):
+        return pq.read_table(parquet_path(csv_path)).to_pandas()
+    return parse_metrics_csv(csv_path)
+
+
+def _mtimes(*paths) -> tuple:
+    mtimes = []
+    for path in paths:
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+
+class MetricsTableCache:
+    """
+    Process-wide cache of loaded statistics tables.
+
+    A table is loaded once and kept split by climate period, each part indexed
+    by datetime, so a request only looks up the rows of its dates. Entries are
+    reloaded when the mtime of the CSV or its Parquet copy changes.
+
+    Requests without a climate period get the rows without a climate period;
+    if every row has one, the rows of DEFAULT_CLIMATE_PERIOD (else of the
+    latest period), so every date gets the row of one explicitly chosen
+    period instead of whichever period comes first in the CSV. Duplicate
+    dates within a period keep their first row.
+    """
+
+    def __init__(self):
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _load(self, csv_path: str) -> dict:
+        table = load_metrics_table(csv_path)
+        if 'climate_period' not in table:
+            groups = {None: table}
+        else:
+            groups = {period: group.drop(columns='climate_period') for period, group in table.groupby('climate_period', sort=False)}
+            without_period = table['climate_period'].isna()
+            if without_period.any() or not groups:
+                groups[None] = table[without_period].drop(columns='climate_period') if without_period.any() else table.drop(columns='climate_period')
+            else:
+                groups[None] = groups[DEFAULT_CLIMATE_PERIOD if DEFAULT_CLIMATE_PERIOD in groups else max(groups, key=str)]
+
+        indexed = {}
+        for period, group in groups.items():
+            group = group.set_index('datetime').sort_index()
+            indexed[period] = group[~group.index.duplicated()]
+        return indexed
+
+    def get(self, csv_path: str, climate_period: str = None) -> pd.DataFrame:
+        """
+        Returns the rows of a statistics table for one climate period (see the class
+        docstring for None), indexed by a unique sorted datetime index. Missing periods
+        give an empty table.
+        """
+        validators = _mtimes(csv_path, parquet_path(csv_path))
+
+        with self._lock:
+            entry = self._tables.get(csv_path)
+        if entry is None or entry[0] != validators:
+            entry = (validators, self._load(csv_path))
+            with self._lock:
+                self._tables[csv_path] = entry
+
+        tables = entry[1]
+        if climate_period in tables:
+            return tables[climate_period]
+        return tables[None].iloc[:0]
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+
+
+_table_cache = MetricsTableCache()
+
+
+def get_table_cache() -> MetricsTableCache:
+    """Returns the process-wide statistics table cache."""
+    return _table_cache
+
+
+def lookup_metrics(table: pd.DataFrame, datetimes) -> pd.DataFrame:
+    """
+    Looks up the statistics rows of the given datetimes in an indexed table.
+
+    Returns:
+        pd.DataFrame: One row per datetime in the given order, NaN for dates without statistics.
+    """
+    return table.reindex(pd.DatetimeIndex(datetimes))
+
+
+def list_metrics_tables(root: str = None) -> list:
+    """Lists the statistics CSVs of the datahub and its climate data."""
+    root = root or utils.GSA_DATAHUB_ROOT
+    csv_paths = []
+    for statistics_dir in (os.path.join(root, 'statistics'), os.path.join(root, 'climate_data', 'statistics')):
+        csv_paths.extend(glob.glob(os.path.join(statistics_dir, '**', METRICS_FILENAME), recursive=True))
+    return sorted(csv_paths)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the statistics CSVs of the datahub to typed Parquet tables.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help="Convert all statistics tables that changed since the last run.")
+    convert_parser.add_argument('--root', default=utils.GSA_DATAHUB_ROOT)
+    convert_parser.add_argument('--force', action='store_true', help="Rewrite tables that are already current.")
+
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        n_converted = 0
+        for csv_path in list_metrics_tables(args.root):
+            if args.force or not is_current(csv_path):
+                convert_metrics_table(csv_path)
+                n_converted += 1
+        print(f"Converted {n_converted} statistics tables.")
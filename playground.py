@@ -1,10 +1,10 @@
 import utils
+import metrics_store
+import dem
 import pandas as pd
 import datetime
 import os
 
-from processors import BaseGeoTIFFProcessor
-
 
 dataset = 'spartacus-v2-1y-1km'
 variable = 'TM'
@@ -16,9 +16,7 @@ GSA_DATAHUB_ROOT = "/home/shared/CRM/11_gsa_datahub/climate_data"
 layerDateCategory = utils.extract_date_category_from_dataset_name(dataset)
 
 # Extract altitude from DEM
-geotiff_processor = BaseGeoTIFFProcessor(GSA_DATAHUB_ROOT)
-dem_fp = f"/home/shared/CRM/11_gsa_datahub/dem/output_COP90_31287.tif"
-altitude = geotiff_processor.extract_value_from_geotiff((dem_fp, lat, lng))
+altitude = dem.get_dem().altitude(lat, lng)
 
 # Extract timeseries and statistics
 dataset_fp = f'climate_data/{dataset}'
@@ -30,8 +28,7 @@ elif layerDateCategory == 'm':
 else:
     timeseries = utils.get_timeseries_from_dataset(dataset_fp, variable, lat, lng, climate_period = "1991_2020")
 
-idr_iqr = pd.read_csv(f"{GSA_DATAHUB_ROOT}/statistics/{dataset}/{variable}/geotiff_metrics_timeseries.csv")
-idr_iqr['datetime'] = pd.to_datetime(idr_iqr['datetime'])
+idr_iqr = metrics_store.load_metrics_table(f"{GSA_DATAHUB_ROOT}/statistics/{dataset}/{variable}/geotiff_metrics_timeseries.csv")
 
 idr_iqr = idr_iqr[idr_iqr['climate_period'] == "1991_2020"]
 
@@ -42,7 +39,7 @@ timeseries['datetime'] = timeseries['datetime']  + pd.Timedelta(hours=12)
 
 timeseries_with_stats = utils.create_timeseries_object(timeseries)
 
-timeseries_with_stats['stats']['altitude'] = altitude[-1]
+timeseries_with_stats['stats']['altitude'] = altitude
 
 
 #%% Get rasterStats
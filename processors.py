@@ -1,10 +1,20 @@
 import glob
 import os
+import atexit
+import threading
+import multiprocessing
 from multiprocessing import Pool
-import rasterio
-from pyproj import Transformer
-from concurrent.futures import ThreadPoolExecutor
+import itertools
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 import asyncio
+from datetime import datetime
+import numpy as np
+
+import cube_store
+import handle_pool
+import file_catalog
+import grid_geometry
+import block_cache
 
 # import nest_asyncio
 # nest_asyncio.apply()
@@ -13,110 +23,606 @@ import asyncio
 class BaseGeoTIFFProcessor:
     """Base class for processing GeoTIFF files, encapsulating common functionalities."""
 
-    def __init__(self, dataset_root: str, month: int = None, day: int = None):
-        """Initializes the processor with the dataset root directory and optional filtering by month and/or day."""
+    def __init__(self, dataset_root: str, month: int = None, day: int = None, start: datetime = None, end: datetime = None,
+                 climate_period: str = None):
+        """
+        Initializes the processor with the dataset root directory and optional filtering by month and/or day,
+        by an inclusive start/end datetime range and by climate period (e.g. '1991_2020').
+        """
         self.dataset_root = dataset_root
         self.month = month
         self.day = day
-        self.transformer = Transformer.from_crs("epsg:4326", "epsg:31287", always_xy=True)
+        self.start = start
+        self.end = end
+        self.climate_period = climate_period
+
+
+    @property
+    def transformer(self):
+        """The WGS84 to EPSG:31287 Transformer of the calling thread, cached instead of built per processor."""
+        return grid_geometry.get_transformer()
 
 
     def list_files_with_extension(self, directory: str, extension: str) -> list:
-        """Lists all files in a directory with a specific extension, optionally filtering by month and/or day."""
+        """
+        Lists all files in a directory with a specific extension that pass the filters of the processor.
+        
+        The filters are applied to the file names, so files outside the requested
+        month/day, date range or climate period are never opened.
+        """
+        catalog = file_catalog.get_catalog()
+        if catalog is not None:
+            catalog_files = catalog.list_files(directory, extension, month=self.month, day=self.day,
+                                               climate_period=self.climate_period, start=self.start, end=self.end)
+            if catalog_files is not None:
+                return catalog_files
+        
         directory = os.path.join(directory, '')
         pattern = f"{directory}*{extension}"
         all_files = glob.glob(pattern)
         
-        if self.month is None and self.day is None:
+        if not self.has_file_filter():
             return all_files
         
-        filtered_files = []
-        for file_path in all_files:
-            filename = os.path.basename(file_path)
+        return [file_path for file_path in all_files if self.matches_date_filter(os.path.basename(file_path))]
+
+
+    @staticmethod
+    def parse_month_day_from_filename(filename: str) -> tuple:
+        """Returns the (month, day) encoded in a SPARTACUS filename, handling the CLIM naming scheme."""
+        if "CLIM" in filename:
+            date_part = filename.split('_')[-3]
+        else:
+            date_part = filename.split('.')[-2].split("_")[-1]
             
-            if "CLIM" in filename:
-                date_part = filename.split('_')[-3]
+        return int(date_part[4:6]), int(date_part[6:8])
+
+
+    def has_file_filter(self) -> bool:
+        return any(value is not None for value in (self.month, self.day, self.start, self.end, self.climate_period))
+
+
+    def matches_date_filter(self, filename: str) -> bool:
+        """Checks whether a filename passes the optional month/day, date range and climate period filters of the processor."""
+        if self.climate_period is not None and file_catalog.parse_climate_period(filename) != self.climate_period:
+            return False
+        
+        if self.start is not None or self.end is not None:
+            file_datetime = file_catalog.parse_datetime(filename)
+            if self.start is not None and file_datetime < self.start:
+                return False
+            if self.end is not None and file_datetime > self.end:
+                return False
+        
+        if self.month is None and self.day is None:
+            return True
+        
+        file_month, file_day = self.parse_month_day_from_filename(filename)
+        
+        if self.month and self.day:
+            return self.month == file_month and self.day == file_day
+        elif self.month:
+            return self.month == file_month
+        elif self.day:
+            return self.day == file_day
+        
+        return False
+
+
+    def resolve_point(self, lat: float, lng: float):
+        """Resolves lat/lng once to a GridCell on the grid shared by the files of the dataset, or None if outside its footprint."""
+        geometry = grid_geometry.get_registry().get(self.dataset_root)
+        if geometry is None:
+            return None
+        x, y = self.transformer.transform(lng, lat)
+        cell = geometry.index(x, y)
+        if cell is None:
+            return None
+        return grid_geometry.GridCell(cell[0], cell[1], geometry)
+
+
+    def build_tasks(self, file_paths: list, lat: float, lng: float) -> list:
+        """Builds the extraction tasks for a point, or no tasks if the point is outside the dataset footprint."""
+        if not file_paths:
+            return []
+        cell = self.resolve_point(lat, lng)
+        if cell is None:
+            return []
+        return [(path, lat, lng, cell) for path in file_paths]
+
+
+    def iter_geotiffs(self, extension: str, lat: float, lng: float, chunk_size: int = 256):
+        """
+        Yields the (path, value) results of a point in chronological chunks of chunk_size files.
+        
+        Each chunk is extracted only when the previous one has been consumed, so callers
+        can pass the first values on while the later files are still unread.
+        """
+        file_paths = sorted(self.list_files_with_extension(self.dataset_root, extension), key=file_catalog.parse_datetime)
+        cell = self.resolve_point(lat, lng) if file_paths else None
+        if cell is None:
+            return
+        for i in range(0, len(file_paths), chunk_size):
+            yield self.extract_chunk(file_paths[i:i + chunk_size], lat, lng, cell)
+
+
+    def extract_chunk(self, file_paths: list, lat: float, lng: float, cell) -> list:
+        """Extracts the values of a resolved point from the given files; engines override this to read in parallel."""
+        return [self.extract_value_from_geotiff((path, lat, lng, cell)) for path in file_paths]
+
+
+    def build_point_tasks(self, file_paths: list, lats, lngs) -> tuple:
+        """
+        Builds multi-point extraction tasks with one vectorized transform for all points.
+        
+        Returns (tasks, inside) where inside masks the points within the dataset footprint;
+        each task only carries the points inside.
+        """
+        lats = np.asarray(lats, dtype=float)
+        lngs = np.asarray(lngs, dtype=float)
+        geometry = grid_geometry.get_registry().get(self.dataset_root) if file_paths else None
+        if geometry is None:
+            return [], np.zeros(len(lats), dtype=bool)
+        
+        xs, ys = self.transformer.transform(lngs, lats)
+        rows, cols, inside = geometry.index_many(xs, ys)
+        if not inside.any():
+            return [], inside
+        
+        tasks = [(path, lats[inside], lngs[inside], rows[inside], cols[inside], geometry) for path in file_paths]
+        return tasks, inside
+
+
+    def extract_values_from_geotiff(self, args):
+        """
+        Extracts the values of many points from one GeoTIFF file.
+        
+        The values are picked from the decoded blocks of the block cache, so every
+        internal tile or strip holding one or more of the points is decoded at most once.
+        """
+        geotiff_path, lats, lngs, rows, cols, geometry = args
+        with handle_pool.open_handle(geotiff_path) as handle:
+            if not geometry.matches(handle.dataset):
+                grid_geometry.get_registry().flag_mismatch(geotiff_path)
+                xs, ys = self.transformer.transform(lngs, lats)
+                rows, cols, inside = grid_geometry.GridGeometry.from_dataset(handle.dataset).index_many(xs, ys)
             else:
-                date_part = filename.split('.')[-2].split("_")[-1]
-                
-            file_month = int(date_part[4:6])
-            file_day = int(date_part[6:8])
+                inside = np.ones(len(rows), dtype=bool)
             
-            if self.month and self.day:
-                if self.month == file_month and self.day == file_day:
-                    filtered_files.append(file_path)
-            elif self.month:
-                if self.month == file_month:
-                    filtered_files.append(file_path)
-            elif self.day:
-                if self.day == file_day:
-                    filtered_files.append(file_path)
-                    
-        return filtered_files
+            values = np.full(len(rows), np.nan, dtype=float)
+            if inside.any():
+                values[inside] = block_cache.get_cache().read_pixels(handle, rows[inside], cols[inside])
+            return (geotiff_path, values)
+
+
+    def build_area_tasks(self, file_paths: list, geometry: dict) -> list:
+        """
+        Builds area extraction tasks for a GeoJSON geometry in EPSG:31287.
+        
+        The geometry is rasterized once to a pixel mask of the window of the dataset
+        grid it covers; each task reads only that window. No tasks are built if the
+        geometry does not cover any pixel of the dataset. The geometry is kept in the
+        tasks for files that are not on the dataset grid.
+        """
+        grid = grid_geometry.get_registry().get(self.dataset_root) if file_paths else None
+        if grid is None:
+            return []
+        
+        area = grid.area_mask(geometry)
+        if area is None:
+            return []
+        window, mask = area
+        return [(path, window, mask, grid, geometry) for path in file_paths]
+
+
+    def extract_area_stats_from_geotiff(self, args):
+        """
+        Extracts mean, min, max and the number of valid pixels of a masked window from one GeoTIFF file.
+
+        A file that is not on the dataset grid gets the mask of its own grid, like the
+        per-file lookup of the point path; if the geometry covers none of its pixels
+        the file yields NaN statistics instead of being dropped from the series.
+        """
+        geotiff_path, window, mask, grid, geometry = args
+        with handle_pool.open_dataset(geotiff_path) as dataset:
+            if not grid.matches(dataset):
+                grid_geometry.get_registry().flag_mismatch(geotiff_path)
+                area = grid_geometry.GridGeometry.from_dataset(dataset, geotiff_path).area_mask(geometry)
+                if area is None:
+                    return (geotiff_path, np.nan, np.nan, np.nan, 0)
+                window, mask = area
+            data = dataset.read(1, window=window)
+            nodata = dataset.nodata
+        
+        values = data[mask].astype(float)
+        valid = ~np.isnan(values)
+        if nodata is not None:
+            valid &= values != nodata
+        values = values[valid]
+        
+        if values.size == 0:
+            return (geotiff_path, np.nan, np.nan, np.nan, 0)
+        return (geotiff_path, values.mean(), values.min(), values.max(), int(values.size))
 
 
     def extract_value_from_geotiff(self, args):
-        """Extracts a value from a GeoTIFF file at specified latitude and longitude."""
-        geotiff_path, lat, lng = args
-        with rasterio.open(geotiff_path) as dataset:
-            x, y = self.transformer.transform(lng, lat)
-            if not (dataset.bounds.left <= x <= dataset.bounds.right and dataset.bounds.bottom <= y <= dataset.bounds.top):
-                return None
-            row, col = dataset.index(x, y)
-            value = dataset.read(1, window=((row, row+1), (col, col+1)))[0, 0]
+        """
+        Extracts a value from a GeoTIFF file at specified latitude and longitude.
+        
+        args is (path, lat, lng) or (path, lat, lng, cell) with a GridCell resolved by
+        resolve_point. The cell is used directly if the file is on the cell's grid.
+        The value is read from the decoded block of the block cache.
+        """
+        geotiff_path, lat, lng, *cell = args
+        with handle_pool.open_handle(geotiff_path) as handle:
+            dataset = handle.dataset
+            if cell and cell[0].geometry.matches(dataset):
+                row, col = cell[0].row, cell[0].col
+            else:
+                if cell:
+                    grid_geometry.get_registry().flag_mismatch(geotiff_path)
+                x, y = self.transformer.transform(lng, lat)
+                if not (dataset.bounds.left <= x <= dataset.bounds.right and dataset.bounds.bottom <= y <= dataset.bounds.top):
+                    return None
+                row, col = dataset.index(x, y)
+                row, col = min(row, dataset.height - 1), min(col, dataset.width - 1)
+            value = block_cache.get_cache().read_pixel(handle, row, col)
             return (geotiff_path, value)
 
 
+class GeoTIFFCubeProcessor(BaseGeoTIFFProcessor):
+    """Serves point time series from a prebuilt point cube store instead of opening one GeoTIFF per time step."""
+
+    def __init__(self, dataset_root: str, store_dir: str, month: int = None, day: int = None, **file_filter):
+        super().__init__(dataset_root, month, day, **file_filter)
+        self.store_dir = store_dir
+
+    def process_geotiffs(self, extension: str, lat: float, lng: float) -> list:
+        store = cube_store.open_point_cube(self.store_dir)
+        x, y = self.transformer.transform(lng, lat)
+        cell = store.index(x, y)
+        if cell is None:
+            return []
+        values = store.read_point(*cell)
+        return [(os.path.join(self.dataset_root, filename), value)
+                for filename, value in zip(store.files, values)
+                if filename.endswith(extension) and self.matches_date_filter(filename)]
+
+    def iter_geotiffs(self, extension: str, lat: float, lng: float, chunk_size: int = 256):
+        # The whole series is one read from the store, it is only split up for the caller
+        results = sorted(self.process_geotiffs(extension, lat, lng), key=lambda res: file_catalog.parse_datetime(os.path.basename(res[0])))
+        for i in range(0, len(results), chunk_size):
+            yield results[i:i + chunk_size]
+
+    def process_geotiffs_points(self, extension: str, lats, lngs) -> tuple:
+        store = cube_store.open_point_cube(self.store_dir)
+        xs, ys = self.transformer.transform(np.asarray(lngs, dtype=float), np.asarray(lats, dtype=float))
+        rows, cols, inside = grid_geometry.GridGeometry(store.width, store.height, store.transform).index_many(xs, ys)
+        if not inside.any():
+            return inside, []
+        values = store.read_points(rows[inside], cols[inside])
+        return inside, [(os.path.join(self.dataset_root, filename), values[:, i])
+                        for i, filename in enumerate(store.files)
+                        if filename.endswith(extension) and self.matches_date_filter(filename)]
+
+
 class GeoTIFFMultiprocessingProcessor(BaseGeoTIFFProcessor):
     """Processes GeoTIFF files using multiprocessing to efficiently extract geographic data."""
 
-    def __init__(self, dataset_root: str, month: int = None, day: int = None, cores: int = 4):
-        super().__init__(dataset_root, month, day)
+    def __init__(self, dataset_root: str, month: int = None, day: int = None, cores: int = 4, **file_filter):
+        super().__init__(dataset_root, month, day, **file_filter)
         self.cores = cores
 
     def process_geotiffs(self, extension: str, lat: float, lng: float) -> list:
         file_paths = self.list_files_with_extension(self.dataset_root, extension)
-        tasks = [(path, lat, lng) for path in file_paths]
+        tasks = self.build_tasks(file_paths, lat, lng)
         with Pool(processes=self.cores) as pool:
             results = pool.map(self.extract_value_from_geotiff, tasks)
         return results
 
+    def process_geotiffs_points(self, extension: str, lats, lngs) -> tuple:
+        file_paths = self.list_files_with_extension(self.dataset_root, extension)
+        tasks, inside = self.build_point_tasks(file_paths, lats, lngs)
+        with Pool(processes=self.cores) as pool:
+            results = pool.map(self.extract_values_from_geotiff, tasks)
+        return inside, results
+
+
+# Worker-local processor of the extraction engine, holding the Transformer of the worker process.
+# File handles and decoded blocks are kept in the worker's own handle_pool and block_cache.
+_worker_processor = None
+# Cache generation of the engine the worker last saw, see ExtractionProcessEngine.clear_caches
+_worker_cache_generation = 0
+
+
+def _init_extraction_worker(max_open: int, max_block_bytes: int):
+    """Applies the API process's handle pool and block cache limits, given as per-worker shares, in a spawned worker."""
+    global _worker_processor
+    handle_pool.configure(max_open=max_open)
+    block_cache.configure(max_bytes=max_block_bytes)
+    _worker_processor = BaseGeoTIFFProcessor(None)
+
+
+def _apply_cache_generation(generation: int):
+    """Clears the worker's handle pool and block cache when the engine's caches were cleared since its last chunk."""
+    global _worker_cache_generation
+    if generation != _worker_cache_generation:
+        handle_pool.get_pool().clear()
+        block_cache.get_cache().clear()
+        _worker_cache_generation = generation
+
+
+def _extract_chunk(chunk):
+    generation, file_paths, lat, lng, cell = chunk
+    _apply_cache_generation(generation)
+    return [_worker_processor.extract_value_from_geotiff((path, lat, lng, cell)) for path in file_paths]
+
+
+def _extract_points_chunk(chunk):
+    generation, file_paths, lats, lngs, rows, cols, geometry = chunk
+    _apply_cache_generation(generation)
+    return [_worker_processor.extract_values_from_geotiff((path, lats, lngs, rows, cols, geometry)) for path in file_paths]
+
+
+class ExtractionProcessEngine:
+    """
+    Long-lived pool of extraction worker processes.
+    
+    The pool is started once per API process and reused across requests. Each worker
+    keeps its own Transformer and file handles, and receives chunks of file paths
+    together with the resolved point instead of one pickled task per file.
+
+    The pool is sized once for the largest configured parallelism. The chunk size
+    and parallelism of a dataset's profile are applied per call by keeping at most
+    that many chunks of the call in flight, so datasets with different profiles
+    share the pool instead of restarting it.
+    """
+
+    def __init__(self, workers: int = 4):
+        self.workers = workers
+        self.cache_generation = 0
+        # Spawned workers start with the module defaults, so the configured limits are passed on,
+        # split between the workers to keep the process's total open handles and block memory within them
+        limits = (max(1, handle_pool.get_pool().max_open // workers), block_cache.get_cache().max_bytes // workers)
+        # spawn: the API process is multi-threaded, forking it could copy held locks into the workers
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=_init_extraction_worker, initargs=limits)
+
+    def _map_chunks(self, func, file_paths: list, workers: int, chunk_size: int, *args) -> list:
+        """Runs func on chunks of chunk_size files with at most workers chunks in flight, keeping the file order."""
+        chunks = [(self.cache_generation, file_paths[i:i + chunk_size], *args) for i in range(0, len(file_paths), chunk_size)]
+        results = [None] * len(chunks)
+        pending = iter(enumerate(chunks))
+        in_flight = {self.executor.submit(func, chunk): i for i, chunk in itertools.islice(pending, max(1, min(workers, self.workers)))}
+
+        try:
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[in_flight.pop(future)] = future.result()
+                    for i, chunk in itertools.islice(pending, 1):
+                        in_flight[self.executor.submit(func, chunk)] = i
+        finally:
+            # Only the chunks of this call are cancelled, chunks of concurrent requests keep running
+            for future in in_flight:
+                future.cancel()
+
+        return [value for chunk_results in results for value in chunk_results]
+
+    def extract(self, file_paths: list, lat: float, lng: float, cell, workers: int = 4, chunk_size: int = 64) -> list:
+        return self._map_chunks(_extract_chunk, file_paths, workers, chunk_size, lat, lng, cell)
+
+    def extract_points(self, file_paths: list, lats, lngs, rows, cols, geometry, workers: int = 4, chunk_size: int = 64) -> list:
+        return self._map_chunks(_extract_points_chunk, file_paths, workers, chunk_size, lats, lngs, rows, cols, geometry)
+
+    def clear_caches(self):
+        """
+        Makes every worker clear its handle pool and block cache before its next chunk.
+
+        The executor cannot address single workers, so the chunks carry a cache
+        generation and a worker clears its caches when the generation changed.
+        """
+        self.cache_generation += 1
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_process_engine = None
+_process_engine_workers = 4
+_process_engine_lock = threading.Lock()
+
+
+def configure_process_engine(workers: int = 4):
+    """
+    Sets the number of worker processes the process engine is started with,
+    i.e. the largest parallelism of the configured engine and the calibrated profiles.
+    A running engine is kept; calls asking for more parallelism than it has are capped.
+    """
+    global _process_engine_workers
+    with _process_engine_lock:
+        _process_engine_workers = workers
+
+
+def clear_process_engine_caches():
+    """Clears the handle pools and block caches of the process engine's workers, if the engine is running."""
+    with _process_engine_lock:
+        if _process_engine is not None:
+            _process_engine.clear_caches()
+
+
+def get_process_engine(workers: int = 4) -> ExtractionProcessEngine:
+    """
+    Returns the extraction process engine of this process, starting it on first use
+    with at least workers processes. A running engine is never restarted.
+    """
+    global _process_engine
+
+    with _process_engine_lock:
+        if _process_engine is None:
+            _process_engine = ExtractionProcessEngine(max(workers, _process_engine_workers))
+            atexit.register(_process_engine.shutdown)
+        return _process_engine
+
+
+class GeoTIFFProcessPoolProcessor(BaseGeoTIFFProcessor):
+    """Processes GeoTIFF files on the long-lived extraction process engine."""
+
+    def __init__(self, dataset_root: str, month: int = None, day: int = None, workers: int = 4, chunk_size: int = 64, **file_filter):
+        super().__init__(dataset_root, month, day, **file_filter)
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+    def process_geotiffs(self, extension: str, lat: float, lng: float) -> list:
+        file_paths = self.list_files_with_extension(self.dataset_root, extension)
+        cell = self.resolve_point(lat, lng) if file_paths else None
+        if cell is None:
+            return []
+        return get_process_engine(self.workers).extract(file_paths, lat, lng, cell, self.workers, self.chunk_size)
+
+    def extract_chunk(self, file_paths: list, lat: float, lng: float, cell) -> list:
+        return get_process_engine(self.workers).extract(file_paths, lat, lng, cell, self.workers, self.chunk_size)
+
+    def process_geotiffs_points(self, extension: str, lats, lngs) -> tuple:
+        file_paths = self.list_files_with_extension(self.dataset_root, extension)
+        tasks, inside = self.build_point_tasks(file_paths, lats, lngs)
+        if not tasks:
+            return inside, []
+        _, task_lats, task_lngs, rows, cols, geometry = tasks[0]
+        return inside, get_process_engine(self.workers).extract_points(file_paths, task_lats, task_lngs, rows, cols, geometry,
+                                                                       self.workers, self.chunk_size)
+
 
 class GeoTIFFThreadingProcessor(BaseGeoTIFFProcessor):
     """Processes GeoTIFF files using threading."""
 
-    def __init__(self, dataset_root: str, month: int = None, day: int = None, threads: int = 4):
-        super().__init__(dataset_root, month, day)
+    def __init__(self, dataset_root: str, month: int = None, day: int = None, threads: int = 4, **file_filter):
+        super().__init__(dataset_root, month, day, **file_filter)
         self.threads = threads
 
     def process_geotiffs(self, extension: str, lat: float, lng: float) -> list:
         file_paths = self.list_files_with_extension(self.dataset_root, extension)
-        tasks = [(path, lat, lng) for path in file_paths]
+        tasks = self.build_tasks(file_paths, lat, lng)
         with ThreadPoolExecutor(max_workers=self.threads) as executor:
             results = list(executor.map(self.extract_value_from_geotiff, tasks))
         return results
+
+    def extract_chunk(self, file_paths: list, lat: float, lng: float, cell) -> list:
+        tasks = [(path, lat, lng, cell) for path in file_paths]
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            return list(executor.map(self.extract_value_from_geotiff, tasks))
+
+    def process_geotiffs_points(self, extension: str, lats, lngs) -> tuple:
+        file_paths = self.list_files_with_extension(self.dataset_root, extension)
+        tasks, inside = self.build_point_tasks(file_paths, lats, lngs)
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            results = list(executor.map(self.extract_values_from_geotiff, tasks))
+        return inside, results
+
+    def process_geotiffs_area(self, extension: str, geometry: dict) -> list:
+        file_paths = self.list_files_with_extension(self.dataset_root, extension)
+        tasks = self.build_area_tasks(file_paths, geometry)
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            results = list(executor.map(self.extract_area_stats_from_geotiff, tasks))
+        return results
     
     
+class AsyncExtractionEngine:
+    """
+    Bounded asyncio extraction engine.
+    
+    Blocking raster reads run on a dedicated thread pool instead of the default
+    executor. Each call keeps at most max_concurrency reads in flight, so a daily
+    dataset does not submit thousands of futures at once. Synchronous callers
+    share one background event loop instead of starting a new loop per request.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='geotiff-async')
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    async def run_blocking(self, func, *args):
+        """Runs a blocking function on the engine's executor and awaits its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def map(self, func, tasks: list, max_concurrency: int = None) -> list:
+        """Awaits func(task) for all tasks with at most max_concurrency calls in flight, keeping the task order."""
+        max_concurrency = max_concurrency or self.max_workers
+        results = [None] * len(tasks)
+        pending = iter(enumerate(tasks))
+
+        async def worker():
+            for i, task in pending:
+                results[i] = await self.run_blocking(func, task)
+
+        await asyncio.gather(*(worker() for _ in range(min(max_concurrency, len(tasks)))))
+        return results
+
+    def _background_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='geotiff-async-loop', daemon=True).start()
+            return self._loop
+
+    def run_sync(self, coro):
+        """Runs a coroutine on the engine's background event loop and waits for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._background_loop()).result()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+_async_engine = None
+_async_engine_lock = threading.Lock()
+
+
+def get_async_engine(max_workers: int = 8) -> AsyncExtractionEngine:
+    """Returns the async extraction engine of this process, starting it on first use."""
+    global _async_engine
+
+    with _async_engine_lock:
+        if _async_engine is None:
+            _async_engine = AsyncExtractionEngine(max_workers)
+            atexit.register(_async_engine.shutdown)
+        return _async_engine
+
+
 class AsyncGeoTIFFProcessor(BaseGeoTIFFProcessor):
     
     """Processes GeoTIFF files using asyncio for asynchronous I/O operations."""
 
-    def __init__(self, dataset_root: str, month: int = None, day: int = None, max_workers: int = 4):
-        super().__init__(dataset_root, month, day)
+    def __init__(self, dataset_root: str, month: int = None, day: int = None, max_workers: int = 4, **file_filter):
+        super().__init__(dataset_root, month, day, **file_filter)
         self.max_workers = max_workers
 
     async def async_extract_value_from_geotiff(self, args):
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(None, self.extract_value_from_geotiff, args)
-        return result
+        return await get_async_engine().run_blocking(self.extract_value_from_geotiff, args)
 
     async def process_geotiffs_async(self, extension: str, lat: float, lng: float) -> list:
-        file_paths = self.list_files_with_extension(self.dataset_root, extension)
-        tasks = [(path, lat, lng) for path in file_paths]
-        async_tasks = [self.async_extract_value_from_geotiff(task) for task in tasks]
-        results = await asyncio.gather(*async_tasks)
-        return results
+        engine = get_async_engine()
+        file_paths = await engine.run_blocking(self.list_files_with_extension, self.dataset_root, extension)
+        tasks = await engine.run_blocking(self.build_tasks, file_paths, lat, lng)
+        return await engine.map(self.extract_value_from_geotiff, tasks, self.max_workers)
+
+    async def process_geotiffs_points_async(self, extension: str, lats, lngs) -> tuple:
+        engine = get_async_engine()
+        file_paths = await engine.run_blocking(self.list_files_with_extension, self.dataset_root, extension)
+        tasks, inside = await engine.run_blocking(self.build_point_tasks, file_paths, lats, lngs)
+        return inside, await engine.map(self.extract_values_from_geotiff, tasks, self.max_workers)
 
     def process_geotiffs(self, extension: str, lat: float, lng: float) -> list:
-        return asyncio.run(self.process_geotiffs_async(extension, lat, lng))
+        return get_async_engine().run_sync(self.process_geotiffs_async(extension, lat, lng))
+
+    def extract_chunk(self, file_paths: list, lat: float, lng: float, cell) -> list:
+        tasks = [(path, lat, lng, cell) for path in file_paths]
+        engine = get_async_engine()
+        return engine.run_sync(engine.map(self.extract_value_from_geotiff, tasks, self.max_workers))
 
+    def process_geotiffs_points(self, extension: str, lats, lngs) -> tuple:
+        return get_async_engine().run_sync(self.process_geotiffs_points_async(extension, lats, lngs))
@@ -0,0 +1,323 @@
+"""
+Bounded-memory statistics of raster layers.
+
+Reading band 1 of a layer at once and filtering it with data[data != nodata]
+holds the raster and a copy of its valid values in memory. The engine here
+walks the layer in windows aligned to its internal blocks (strips are
+grouped to at least MIN_WINDOW_PIXELS pixels) and keeps running min, max,
+sum and counts, with nodata and NaN masked in place instead of copied out.
+The windows are spread over a thread pool in which every thread reads
+through its own dataset handle, as GDAL handles must not be shared between
+threads, so peak memory is about one window per thread whatever the size of
+the layer.
+
+Histograms and quantiles (e.g. p2/p98 for colour scales) come from the same
+pass: every block also updates a QuantileSketch, a mergeable log-bucket
+sketch whose quantiles are within SKETCH_RELATIVE_ACCURACY of the true value,
+so no quantile needs a sort of the layer.
+
+Usage:
+    stats = raster_stats.compute_stats(path)
+    stats = raster_stats.compute_stats(path, histogram_bins=64, quantiles=(0.02, 0.98))
+"""
+
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+
+DEFAULT_WORKERS = 4
+MIN_WINDOW_PIXELS = 65536
+MAX_HISTOGRAM_BINS = 1000
+SKETCH_RELATIVE_ACCURACY = 0.005
+# Magnitudes below this are counted as zero by the sketch
+SKETCH_MIN_MAGNITUDE = 1e-9
+
+_workers = DEFAULT_WORKERS
+
+
+class _Buckets:
+    """Counts of contiguous integer bucket keys, growable in both directions."""
+
+    def __init__(self):
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def _extend(self, low: int, high: int):
+        if self.counts.size == 0:
+            self.offset = low
+            self.counts = np.zeros(high - low + 1, dtype=np.int64)
+            return
+        new_low, new_high = min(low, self.offset), max(high, self.offset + self.counts.size - 1)
+        if (new_low, new_high) != (self.offset, self.offset + self.counts.size - 1):
+            counts = np.zeros(new_high - new_low + 1, dtype=np.int64)
+            counts[self.offset - new_low:self.offset - new_low + self.counts.size] = self.counts
+            self.offset, self.counts = new_low, counts
+
+    def add(self, keys: np.ndarray):
+        if keys.size == 0:
+            return
+        low, high = int(keys.min()), int(keys.max())
+        self._extend(low, high)
+        self.counts[low - self.offset:high - self.offset + 1] += np.bincount(keys - low, minlength=high - low + 1)
+
+    def merge(self, other: "_Buckets"):
+        if other.counts.size == 0:
+            return
+        self._extend(other.offset, other.offset + other.counts.size - 1)
+        start = other.offset - self.offset
+        self.counts[start:start + other.counts.size] += other.counts
+
+    def nonzero(self) -> tuple:
+        """Returns the keys and counts of the non-empty buckets in ascending key order."""
+        indices = np.flatnonzero(self.counts)
+        return indices + self.offset, self.counts[indices]
+
+
+class QuantileSketch:
+    """
+    Mergeable sketch of a value distribution with relative-accuracy quantiles.
+
+    A value x is counted in the bucket ceil(log_gamma(|x|)) of its sign, with
+    gamma = (1 + a) / (1 - a), so every bucket spans a relative width of 2a and
+    its representative value is within the relative accuracy a of all values
+    in it. Blocks are added with one vectorized log and bincount, and sketches
+    of different threads are merged by adding their bucket counts.
+    """
+
+    def __init__(self, relative_accuracy: float = SKETCH_RELATIVE_ACCURACY):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = _Buckets()
+        self.negative = _Buckets()
+        self.zero_count = 0
+
+    def _keys(self, magnitudes: np.ndarray) -> np.ndarray:
+        return np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+
+    def _values(self, keys: np.ndarray) -> np.ndarray:
+        return 2 * np.power(self.gamma, keys.astype(np.float64)) / (self.gamma + 1)
+
+    def update(self, values: np.ndarray):
+        """Adds the values of a block; the values must not contain NaN."""
+        values = values.astype(np.float64, copy=False)
+        magnitudes = np.abs(values)
+        is_zero = magnitudes < SKETCH_MIN_MAGNITUDE
+        self.zero_count += int(np.count_nonzero(is_zero))
+        self.positive.add(self._keys(magnitudes[(values > 0) & ~is_zero]))
+        self.negative.add(self._keys(magnitudes[(values < 0) & ~is_zero]))
+
+    def merge(self, other: "QuantileSketch"):
+        self.positive.merge(other.positive)
+        self.negative.merge(other.negative)
+        self.zero_count += other.zero_count
+
+    def distribution(self) -> tuple:
+        """
+        Returns:
+            tuple: (values, counts) of the non-empty buckets with their representative values in ascending order.
+        """
+        negative_keys, negative_counts = self.negative.nonzero()
+        positive_keys, positive_counts = self.positive.nonzero()
+        values = np.concatenate([-self._values(negative_keys[::-1]), [0.0], self._values(positive_keys)])
+        counts = np.concatenate([negative_counts[::-1], [self.zero_count], positive_counts])
+        return values[counts > 0], counts[counts > 0]
+
+    def quantiles(self, qs) -> list:
+        """Returns the approximate values at the quantiles qs (each in [0, 1])."""
+        values, counts = self.distribution()
+        if counts.size == 0:
+            return [float('nan')] * len(qs)
+        cumulative = np.cumsum(counts)
+        ranks = np.asarray(qs, dtype=np.float64) * (cumulative[-1] - 1)
+        return values[np.searchsorted(cumulative, ranks, side='right')].tolist()
+
+    def histogram(self, bins: int, low: float, high: float) -> tuple:
+        """
+        Returns a histogram of bins equal-width bins over [low, high], with every
+        bucket counted in the bin of its representative value.
+
+        Returns:
+            tuple: (edges, counts) as lists of bins + 1 edges and bins counts.
+        """
+        values, counts = self.distribution()
+        edges = np.linspace(low, high, bins + 1)
+        if high > low:
+            indices = np.clip(((values - low) / (high - low) * bins).astype(np.int64), 0, bins - 1)
+        else:
+            indices = np.zeros(values.size, dtype=np.int64)
+        return edges.tolist(), np.bincount(indices, weights=counts, minlength=bins).astype(np.int64).tolist()
+
+
+class RasterStatsAccumulator:
+    """
+    Running min, max, sum and counts of the blocks of a band, mergeable across threads,
+    optionally with a QuantileSketch of the valid values.
+    """
+
+    def __init__(self, sketch: bool = False):
+        self.min = math.inf
+        self.max = -math.inf
+        self.sum = 0.0
+        self.count = 0
+        self.nodata_count = 0
+        self.sketch = QuantileSketch() if sketch else None
+
+    def update(self, data: np.ndarray, nodata=None):
+        """Adds a block; pixels equal to nodata or NaN are counted as nodata."""
+        valid = ~np.isnan(data) if data.dtype.kind == 'f' else np.ones(data.shape, dtype=bool)
+        if nodata is not None:
+            valid &= data != nodata
+
+        count = int(np.count_nonzero(valid))
+        self.nodata_count += int(data.size) - count
+        if count == 0:
+            return
+
+        if data.dtype.kind == 'f':
+            lowest, highest = -np.inf, np.inf
+        else:
+            lowest, highest = np.iinfo(data.dtype).min, np.iinfo(data.dtype).max
+
+        self.min = min(self.min, float(np.min(data, where=valid, initial=highest)))
+        self.max = max(self.max, float(np.max(data, where=valid, initial=lowest)))
+        self.sum += float(np.sum(data, where=valid, dtype=np.float64))
+        self.count += count
+
+        if self.sketch is not None:
+            self.sketch.update(data[valid])
+
+    def merge(self, other: "RasterStatsAccumulator"):
+        """Adds the blocks accumulated by another accumulator."""
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sum += other.sum
+        self.count += other.count
+        self.nodata_count += other.nodata_count
+        if self.sketch is not None:
+            self.sketch.merge(other.sketch)
+
+    def result(self, histogram_bins: int = None, quantiles=None) -> dict:
+        """
+        Args:
+            histogram_bins (int): Number of equal-width histogram bins over [min, max], needs the sketch.
+            quantiles (list): Quantiles in [0, 1] to estimate from the sketch, e.g. [0.02, 0.98].
+
+        Returns:
+            dict: min, max, mean, count of valid pixels and nodata_count; min, max
+            and mean are NaN for a band without valid pixels. With histogram_bins
+            also 'histogram' with 'edges' and 'counts', with quantiles also
+            'quantiles' keyed by percentile ('p2', 'p98').
+        """
+        if self.count == 0:
+            min_val = max_val = mean_val = float('nan')
+        else:
+            min_val, max_val, mean_val = self.min, self.max, self.sum / self.count
+
+        stats = {
+            'min': min_val,
+            'max': max_val,
+            'mean': mean_val,
+            'count': self.count,
+            'nodata_count': self.nodata_count
+        }
+
+        if histogram_bins:
+            edges, counts = self.sketch.histogram(histogram_bins, min_val, max_val)
+            stats['histogram'] = {'edges': edges, 'counts': counts}
+        if quantiles:
+            # Sketch values are clamped to the exact range, and p0/p100 are the exact min and max
+            values = np.clip(self.sketch.quantiles(quantiles), min_val, max_val)
+            values = np.where(np.asarray(quantiles) == 0, min_val, np.where(np.asarray(quantiles) == 1, max_val, values)).tolist()
+            stats['quantiles'] = {f"p{q * 100:g}": value for q, value in zip(quantiles, values)}
+
+        return stats
+
+
+def block_windows(src, band: int = 1) -> list:
+    """
+    Lists windows covering a band that are aligned to its internal blocks.
+
+    Tiles are used as they are; strips (and small tiles) are stacked vertically
+    until a window holds at least MIN_WINDOW_PIXELS pixels, so that every block
+    is decoded exactly once and a window is not a single row.
+    """
+    block_height, block_width = src.block_shapes[band - 1]
+    window_height = block_height * max(1, MIN_WINDOW_PIXELS // (block_height * block_width))
+
+    return [Window(col, row, min(block_width, src.width - col), min(window_height, src.height - row))
+            for row in range(0, src.height, window_height)
+            for col in range(0, src.width, block_width)]
+
+
+def _accumulate_windows(path: str, windows: list, band: int, sketch: bool) -> RasterStatsAccumulator:
+    """Reads the given windows one at a time through a handle owned by the calling thread."""
+    accumulator = RasterStatsAccumulator(sketch)
+    with rasterio.open(path) as src:
+        for window in windows:
+            accumulator.update(src.read(band, window=window), src.nodata)
+    return accumulator
+
+
+def validate_histogram_bins(bins):
+    """
+    Raises:
+        ValueError: If bins is not an integer between 1 and MAX_HISTOGRAM_BINS.
+    """
+    if isinstance(bins, bool) or not isinstance(bins, int) or not 1 <= bins <= MAX_HISTOGRAM_BINS:
+        raise ValueError(f"histogram_bins must be an integer between 1 and {MAX_HISTOGRAM_BINS}")
+    return bins
+
+
+def validate_quantiles(quantiles):
+    """
+    Raises:
+        ValueError: If quantiles is not a non-empty list of numbers in [0, 1].
+    """
+    if (not isinstance(quantiles, list) or not quantiles or len(quantiles) > MAX_HISTOGRAM_BINS
+            or not all(isinstance(q, (int, float)) and not isinstance(q, bool) and 0 <= q <= 1 for q in quantiles)):
+        raise ValueError("quantiles must be a list of numbers between 0 and 1")
+    return [float(q) for q in quantiles]
+
+
+def compute_stats(path: str, band: int = 1, workers: int = None, histogram_bins: int = None, quantiles=None) -> dict:
+    """
+    Computes the statistics of a band block by block.
+
+    Args:
+        path (str): Path to the raster file.
+        band (int): The band to compute the statistics of.
+        workers (int): Number of threads, each reading every workers-th window; defaults to the configured number.
+        histogram_bins (int): Also return a histogram with this many equal-width bins over [min, max].
+        quantiles (list): Also return approximate values at these quantiles in [0, 1].
+
+    Returns:
+        dict: min, max, mean, count of valid pixels and nodata_count, and the
+        histogram and quantiles if requested (see RasterStatsAccumulator.result).
+    """
+    workers = workers or _workers
+    sketch = bool(histogram_bins or quantiles)
+
+    with rasterio.open(path) as src:
+        windows = block_windows(src, band)
+    workers = max(1, min(workers, len(windows)))
+
+    accumulator = RasterStatsAccumulator(sketch)
+    if workers == 1:
+        accumulator.merge(_accumulate_windows(path, windows, band, sketch))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Interleaved windows keep the threads on neighbouring blocks of the file
+            futures = [executor.submit(_accumulate_windows, path, windows[i::workers], band, sketch) for i in range(workers)]
+            for future in futures:
+                accumulator.merge(future.result())
+
+    return accumulator.result(histogram_bins, quantiles)
+
+
+def configure(workers: int = DEFAULT_WORKERS):
+    """Sets the default number of threads of compute_stats."""
+    global _workers
+    _workers = workers
@@ -0,0 +1,197 @@
+"""
+Precomputed statistics of the GeoTIFF layers in the datahub tree.
+
+The layers never change after delivery, but /rasterStats used to read the
+whole band and build a filtered copy of it on every call. The store is an
+SQLite database with one row per GeoTIFF holding min, max, mean, count of
+valid pixels and count of nodata pixels, keyed by path and mtime. It is
+filled at ingest by the CLI, which computes missing and stale entries in
+parallel worker processes::
+
+    python raster_stats_store.py fill --jobs 8
+
+An entry is only served while the mtime of its file still matches the one
+it was computed from; otherwise callers compute the statistics from the file.
+"""
+
+import argparse
+import math
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import utils
+import raster_stats
+
+STORE_FILENAME = "raster_stats.sqlite"
+STAT_COLUMNS = ('min', 'max', 'mean', 'count', 'nodata_count')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS raster_stats (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    min REAL,
+    max REAL,
+    mean REAL,
+    count INTEGER NOT NULL,
+    nodata_count INTEGER NOT NULL
+);
+"""
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _sql_value(value):
+    """Maps NaN (the statistics of a layer without valid pixels) to NULL."""
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def compute_entry(path: str) -> tuple:
+    """
+    Computes the statistics of one GeoTIFF, as run by the fill workers.
+
+    Returns:
+        tuple: (path, mtime_ns, stats, error) with stats None and the error message if the file could not be read.
+    """
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+        # The fill already runs one file per worker process, so every file is read by a single thread
+        return path, mtime_ns, raster_stats.compute_stats(path, workers=1), None
+    except Exception as e:
+        return path, None, None, str(e)
+
+
+class RasterStatsStore:
+    """SQLite backed store of per-layer raster statistics with one connection per thread."""
+
+    def __init__(self, db_path: str, root: str = None):
+        self.db_path = db_path
+        self.root = os.path.normpath(root or utils.GSA_DATAHUB_ROOT)
+        self._local = threading.local()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            self._local.connection = conn
+        return conn
+
+    def create_schema(self):
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+
+    def lookup(self, path: str):
+        """
+        Returns the stored statistics of a GeoTIFF, or None if it has no entry or the file changed since.
+
+        Returns:
+            dict or None: min, max, mean, count and nodata_count.
+        """
+        path = os.path.normpath(path)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            row = self.connection.execute(f"SELECT mtime_ns, {', '.join(STAT_COLUMNS)} FROM raster_stats WHERE path = ?",
+                                          (path,)).fetchone()
+        except (FileNotFoundError, sqlite3.OperationalError):
+            return None
+
+        if row is None or row[0] != mtime_ns:
+            return None
+        return {column: (float('nan') if value is None else value) for column, value in zip(STAT_COLUMNS, row[1:])}
+
+    def put_many(self, entries):
+        """Writes (path, mtime_ns, stats) entries, replacing existing ones."""
+        rows = [(os.path.normpath(path), mtime_ns, *(_sql_value(stats[column]) for column in STAT_COLUMNS))
+                for path, mtime_ns, stats in entries]
+        self.connection.executemany("INSERT OR REPLACE INTO raster_stats VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        self.connection.commit()
+
+    def list_layers(self, extension: str = '.tif') -> dict:
+        """Returns the current mtime of every GeoTIFF below the root, keyed by normalized path."""
+        layers = {}
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(extension):
+                    path = os.path.normpath(os.path.join(directory, filename))
+                    layers[path] = os.stat(path).st_mtime_ns
+        return layers
+
+    def fill(self, jobs: int = 4, force: bool = False, batch_size: int = 256) -> dict:
+        """
+        Computes the statistics of all GeoTIFFs below the root that have no current entry.
+
+        Files are read in parallel worker processes and the results are written
+        in batches by this process. Entries of files that disappeared are removed.
+
+        Returns:
+            dict: Counts of computed, unchanged, failed and removed entries.
+        """
+        self.create_schema()
+        known = dict(self.connection.execute("SELECT path, mtime_ns FROM raster_stats"))
+        layers = self.list_layers()
+
+        pending = sorted(path for path, mtime_ns in layers.items() if force or known.get(path) != mtime_ns)
+        summary = {'computed': 0, 'unchanged': len(layers) - len(pending), 'failed': 0, 'removed': 0}
+
+        batch = []
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for path, mtime_ns, stats, error in executor.map(compute_entry, pending, chunksize=16):
+                if error is not None:
+                    print(f"Failed to compute statistics of {path}: {error}")
+                    summary['failed'] += 1
+                    continue
+                batch.append((path, mtime_ns, stats))
+                if len(batch) >= batch_size:
+                    self.put_many(batch)
+                    summary['computed'] += len(batch)
+                    batch = []
+        if batch:
+            self.put_many(batch)
+            summary['computed'] += len(batch)
+
+        removed = [(path,) for path in set(known) - set(layers)]
+        self.connection.executemany("DELETE FROM raster_stats WHERE path = ?", removed)
+        self.connection.commit()
+        summary['removed'] = len(removed)
+
+        return summary
+
+
+def default_store_path() -> str:
+    return os.path.join(utils.GSA_DATAHUB_ROOT, STORE_FILENAME)
+
+
+def get_store():
+    """Returns the process-wide stats store, or None if no store database has been filled yet."""
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            db_path = default_store_path()
+            if not os.path.isfile(db_path):
+                return None
+            _store = RasterStatsStore(db_path)
+        return _store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the statistics of the datahub GeoTIFF layers.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    fill_parser = subparsers.add_parser('fill', help="Compute the statistics of all new and changed layers.")
+    fill_parser.add_argument('--root', default=utils.GSA_DATAHUB_ROOT)
+    fill_parser.add_argument('--db', default=None, help=f"Store database, defaults to <root>/{STORE_FILENAME}.")
+    fill_parser.add_argument('--jobs', type=int, default=4)
+    fill_parser.add_argument('--force', action='store_true', help="Recompute entries that are already current.")
+
+    args = parser.parse_args()
+
+    if args.command == 'fill':
+        db_path = args.db or os.path.join(args.root, STORE_FILENAME)
+        store = RasterStatsStore(db_path, root=args.root)
+        summary = store.fill(jobs=args.jobs, force=args.force)
+        print(f"Computed statistics of {summary['computed']} layers ({summary['unchanged']} unchanged), "
+              f"{summary['failed']} failed, {summary['removed']} removed.")
@@ -3,6 +3,7 @@ import requests
 import json
 import logging
 import datetime
+import numpy as np
 
 # RUN TEST WITH: pytest -v --tb=short tests/test_api_endpoints.py
 
@@ -124,12 +125,56 @@ class TestApiEndpoints:
             assert 'min' in data
             assert 'max' in data
             assert 'mean' in data
+            assert data['count'] > 0
+            assert data['nodata_count'] >= 0
+            assert data['min'] <= data['mean'] <= data['max']
             logging.info("Raster stats test passed")
         except AssertionError as e:
             self.log_error("test_raster_stats", str(e))
             raise
 
 
+    def test_raster_stats_histogram_quantiles(self, api_client):
+        """Test the optional histogram and quantiles of the raster stats endpoint"""
+        logging.info("Running test_raster_stats_histogram_quantiles")
+        try:
+            now = datetime.datetime.now()
+            variable = "TM"
+            layer_name = f"SPARTACUS2-MONTHLY_{variable}_{now.year}_{now.year}{now.month:02d}01T000000"
+
+            params = {
+                'dataset': 'spartacus-v2-1m-1km',
+                'selectedLayerName': layer_name,
+                'variable': variable,
+                'climate': False,
+                'histogram_bins': 16,
+                'quantiles': [0.02, 0.98]
+            }
+
+            response = requests.post(
+                f"{api_client['base_url']}/rasterStats",
+                data=json.dumps(params),
+                headers=api_client['headers']
+            )
+
+            assert response.status_code == 200
+            data = response.json()
+            assert len(data['histogram']['edges']) == 17
+            assert sum(data['histogram']['counts']) == data['count']
+            assert data['min'] <= data['quantiles']['p2'] <= data['quantiles']['p98'] <= data['max']
+
+            params['quantiles'] = [1.5]
+            response = requests.post(
+                f"{api_client['base_url']}/rasterStats",
+                data=json.dumps(params),
+                headers=api_client['headers']
+            )
+            assert response.status_code == 400
+            logging.info("Raster stats histogram and quantiles test passed")
+        except AssertionError as e:
+            self.log_error("test_raster_stats_histogram_quantiles", str(e))
+            raise
+
     def test_raster_stats_climate(self, api_client):
         """Test raster stats endpoint"""
         logging.info("Running test_raster_stats_climate")
@@ -268,3 +313,345 @@ class TestApiEndpoints:
         except AssertionError as e:
             self.log_error("test_raster_stats_nonexistent_layer", str(e))
             raise
+
+    def test_grid_timeseries_outside_footprint(self, api_client):
+        """Test grid timeseries endpoint with a point outside the dataset grid"""
+        logging.info("Running test_grid_timeseries_outside_footprint")
+        try:
+            params = {
+                'dataset': 'spartacus-v2-1y-1km',
+                'variable': 'TM',
+                'layerDate': '2020-01-01 00:00:00',
+                'lat': 40,
+                'lng': 0,
+                'climate': False
+            }
+            
+            response = requests.post(
+                f"{api_client['base_url']}/gridTimeseries", 
+                data=json.dumps(params), 
+                headers=api_client['headers']
+            )
+            
+            # Expect 204 No Content response without any raster being read
+            assert response.status_code == 204
+            logging.info("Grid timeseries outside footprint test passed")
+        except AssertionError as e:
+            self.log_error("test_grid_timeseries_outside_footprint", str(e))
+            raise
+
+    def test_grid_timeseries_batch(self, api_client):
+        """Test batch grid timeseries endpoint with points inside and outside the grid"""
+        logging.info("Running test_grid_timeseries_batch")
+        try:
+            params = {
+                'dataset': 'spartacus-v2-1y-1km',
+                'variable': 'TM',
+                'layerDate': '2020-01-01 00:00:00',
+                'points': [{'lat': 47, 'lng': 15}, {'lat': 47.1, 'lng': 15.1}, {'lat': 40, 'lng': 0}],
+                'climate': False
+            }
+            
+            response = requests.post(
+                f"{api_client['base_url']}/gridTimeseriesBatch", 
+                data=json.dumps(params), 
+                headers=api_client['headers']
+            )
+            
+            assert response.status_code == 200
+            results = response.json()['results']
+            assert set(results.keys()) == {'47,15', '47.1,15.1', '40,0'}
+            assert results['40,0'] is None
+            assert len(results['47,15']['dates']) == len(results['47,15']['values'])
+            logging.info("Grid timeseries batch test passed")
+        except AssertionError as e:
+            self.log_error("test_grid_timeseries_batch", str(e))
+            raise
+
+    def test_altitude_batch(self, api_client):
+        """Test batch altitude lookup in the DEM"""
+        logging.info("Running test_altitude_batch")
+        try:
+            params = {
+                'points': [{'lat': 47, 'lng': 15}, {'lat': 47.1, 'lng': 15.1}, {'lat': 40, 'lng': 0}]
+            }
+
+            response = requests.post(
+                f"{api_client['base_url']}/altitudeBatch",
+                data=json.dumps(params),
+                headers=api_client['headers']
+            )
+
+            assert response.status_code == 200
+            results = response.json()['results']
+            assert set(results.keys()) == {'47,15', '47.1,15.1', '40,0'}
+            assert results['40,0'] is None
+            assert isinstance(results['47,15'], float)
+            logging.info("Altitude batch test passed")
+        except AssertionError as e:
+            self.log_error("test_altitude_batch", str(e))
+            raise
+
+    def test_area_timeseries(self, api_client):
+        """Test area timeseries endpoint with a bounding box"""
+        logging.info("Running test_area_timeseries")
+        try:
+            params = {
+                'dataset': 'spartacus-v2-1y-1km',
+                'variable': 'TM',
+                'layerDate': '2020-01-01 00:00:00',
+                'bbox': [14.9, 46.9, 15.1, 47.1],
+                'climate': False
+            }
+            
+            response = requests.post(
+                f"{api_client['base_url']}/areaTimeseries", 
+                data=json.dumps(params), 
+                headers=api_client['headers']
+            )
+            
+            assert response.status_code == 200
+            timeseries = response.json()['timeseries']
+            assert len(timeseries['dates']) == len(timeseries['values'])
+            assert len(timeseries['min']) == len(timeseries['max']) == len(timeseries['values'])
+            logging.info("Area timeseries test passed")
+        except AssertionError as e:
+            self.log_error("test_area_timeseries", str(e))
+            raise
+
+    def test_area_timeseries_invalid_area(self, api_client):
+        """Test that malformed geometries and bounding boxes are rejected with 400"""
+        logging.info("Running test_area_timeseries_invalid_area")
+        try:
+            params = {
+                'dataset': 'spartacus-v2-1y-1km',
+                'variable': 'TM',
+                'layerDate': '2020-01-01 00:00:00',
+                'climate': False
+            }
+            invalid_areas = [
+                {'geometry': 'POLYGON((14 47, 15 47, 15 48, 14 47))'},
+                {'geometry': {'type': 'Point', 'coordinates': [15, 47]}},
+                {'geometry': {'type': 'Polygon', 'coordinates': [[[14, 'a'], [15, 47], [15, 48], [14, 47]]]}},
+                {'bbox': [14.9, 46.9, 15.1]},
+                {'bbox': [14.9, 46.9, '15.1', 47.1]}
+            ]
+            
+            for area in invalid_areas:
+                response = requests.post(
+                    f"{api_client['base_url']}/areaTimeseries", 
+                    data=json.dumps({**params, **area}), 
+                    headers=api_client['headers']
+                )
+                assert response.status_code == 400, f"Expected 400 for {area}, got {response.status_code}"
+            logging.info("Area timeseries invalid area test passed")
+        except AssertionError as e:
+            self.log_error("test_area_timeseries_invalid_area", str(e))
+            raise
+
+    def test_grid_timeseries_date_range(self, api_client):
+        """Test grid timeseries endpoint restricted to a start/end date range"""
+        logging.info("Running test_grid_timeseries_date_range")
+        try:
+            params = {
+                'dataset': 'spartacus-v2-1y-1km',
+                'variable': 'TM',
+                'layerDate': '2020-01-01 00:00:00',
+                'lat': 47,
+                'lng': 15,
+                'start': '2010-01-01',
+                'end': '2019-12-31',
+                'climate': False
+            }
+            
+            response = requests.post(
+                f"{api_client['base_url']}/gridTimeseries", 
+                data=json.dumps(params), 
+                headers=api_client['headers']
+            )
+            
+            assert response.status_code == 200
+            dates = response.json()['timeseries']['dates']
+            assert len(dates) == 10
+            logging.info("Grid timeseries date range test passed")
+        except AssertionError as e:
+            self.log_error("test_grid_timeseries_date_range", str(e))
+            raise
+
+    def test_grid_timeseries_stream(self, api_client):
+        """Test grid timeseries endpoint in streaming NDJSON mode"""
+        logging.info("Running test_grid_timeseries_stream")
+        try:
+            params = {
+                'dataset': 'spartacus-v2-1y-1km',
+                'variable': 'TM',
+                'layerDate': '2020-01-01 00:00:00',
+                'lat': 47,
+                'lng': 15,
+                'climate': False,
+                'stream': True
+            }
+            
+            response = requests.post(
+                f"{api_client['base_url']}/gridTimeseries", 
+                data=json.dumps(params), 
+                headers=api_client['headers'],
+                stream=True
+            )
+            
+            assert response.status_code == 200
+            assert response.headers['Content-Type'].startswith('application/x-ndjson')
+            lines = [json.loads(line) for line in response.iter_lines() if line]
+            records, last = lines[:-1], lines[-1]
+            assert len(records) > 0
+            assert [record['date'] for record in records] == sorted(record['date'] for record in records)
+            assert 'current_location_stats' in last['stats']
+            logging.info("Grid timeseries stream test passed")
+        except AssertionError as e:
+            self.log_error("test_grid_timeseries_stream", str(e))
+            raise
+
+    GRID_TIMESERIES_PARAMS = {
+        'dataset': 'spartacus-v2-1y-1km',
+        'variable': 'TM',
+        'layerDate': '2020-01-01 00:00:00',
+        'lat': 47,
+        'lng': 15,
+        'climate': False
+    }
+
+    def test_grid_timeseries_arrow(self, api_client):
+        """Test grid timeseries endpoint with an Arrow IPC response"""
+        pa = pytest.importorskip("pyarrow")
+        logging.info("Running test_grid_timeseries_arrow")
+        try:
+            response = requests.post(
+                f"{api_client['base_url']}/gridTimeseries", 
+                data=json.dumps(self.GRID_TIMESERIES_PARAMS), 
+                headers={**api_client['headers'], 'Accept': 'application/vnd.apache.arrow.stream'}
+            )
+            
+            assert response.status_code == 200
+            assert response.headers['Content-Type'].startswith('application/vnd.apache.arrow.stream')
+            table = pa.ipc.open_stream(response.content).read_all()
+            assert table.column_names[:2] == ['date', 'value']
+            assert table.schema.field('date').type == pa.timestamp('ms')
+            assert table.schema.field('value').type == pa.float32()
+            assert table.num_rows > 0
+            stats = json.loads(table.schema.metadata[b'stats'])
+            assert 'current_location_stats' in stats
+            # Per-date ranges are sent as float32 columns, only their means stay in the stats
+            for key in ('idr_full', 'iqr_full', 'minmax_full'):
+                assert table.schema.field(f'{key}_min').type == pa.float32()
+                assert table.schema.field(f'{key}_max').type == pa.float32()
+                assert 'min' not in stats[key] and 'mean' in stats[key]
+            logging.info("Grid timeseries Arrow test passed")
+        except AssertionError as e:
+            self.log_error("test_grid_timeseries_arrow", str(e))
+            raise
+
+    def test_grid_timeseries_msgpack(self, api_client):
+        """Test grid timeseries endpoint with a MessagePack response"""
+        msgpack = pytest.importorskip("msgpack")
+        logging.info("Running test_grid_timeseries_msgpack")
+        try:
+            response = requests.post(
+                f"{api_client['base_url']}/gridTimeseries", 
+                data=json.dumps(self.GRID_TIMESERIES_PARAMS), 
+                headers={**api_client['headers'], 'Accept': 'application/msgpack'}
+            )
+            
+            assert response.status_code == 200
+            assert response.headers['Content-Type'].startswith('application/msgpack')
+            body = msgpack.unpackb(response.content, raw=False)
+            columns = {name: np.frombuffer(column['data'], dtype=column['dtype']) for name, column in body['columns'].items()}
+            assert columns['date'].dtype == np.dtype('<i8')
+            assert columns['value'].dtype == np.dtype('<f4')
+            assert body['length'] > 0
+            assert all(len(values) == body['length'] for values in columns.values())
+            assert 'current_location_stats' in body['stats']
+            # Per-date ranges are sent as float32 columns, only their means stay in the stats
+            for key in ('idr_full', 'iqr_full', 'minmax_full'):
+                assert columns[f'{key}_min'].dtype == np.dtype('<f4')
+                assert columns[f'{key}_max'].dtype == np.dtype('<f4')
+                assert 'min' not in body['stats'][key] and 'mean' in body['stats'][key]
+            logging.info("Grid timeseries MessagePack test passed")
+        except AssertionError as e:
+            self.log_error("test_grid_timeseries_msgpack", str(e))
+            raise
+
+    def test_grid_timeseries_not_acceptable(self, api_client):
+        """Test that an Accept header matching no available format is answered with 406"""
+        logging.info("Running test_grid_timeseries_not_acceptable")
+        try:
+            response = requests.post(
+                f"{api_client['base_url']}/gridTimeseries", 
+                data=json.dumps(self.GRID_TIMESERIES_PARAMS), 
+                headers={**api_client['headers'], 'Accept': 'text/csv'}
+            )
+            
+            assert response.status_code == 406
+            assert 'application/json' in response.text
+            logging.info("Grid timeseries not acceptable test passed")
+        except AssertionError as e:
+            self.log_error("test_grid_timeseries_not_acceptable", str(e))
+            raise
+
+    def test_grid_timeseries_reference_periods(self, api_client):
+        """Test grid timeseries endpoint with custom climate reference periods"""
+        logging.info("Running test_grid_timeseries_reference_periods")
+        try:
+            params = {
+                'dataset': 'spartacus-v2-1y-1km',
+                'variable': 'TM',
+                'layerDate': '2020-01-01 00:00:00',
+                'lat': 47,
+                'lng': 15,
+                'climate': False,
+                'reference_periods': ['1971_2000', '1981_2010', {'name': 'recent', 'start': '2011-01-01', 'end': '2020-12-31'}]
+            }
+            
+            response = requests.post(
+                f"{api_client['base_url']}/gridTimeseries", 
+                data=json.dumps(params), 
+                headers=api_client['headers']
+            )
+            
+            assert response.status_code == 200
+            location_stats = response.json()['stats']['current_location_stats']
+            assert {'overall', '1971_2000', '1981_2010', 'recent'} <= set(location_stats.keys())
+            assert location_stats['1981_2010']['min']['date'][:4] >= '1981'
+            logging.info("Grid timeseries reference periods test passed")
+        except AssertionError as e:
+            self.log_error("test_grid_timeseries_reference_periods", str(e))
+            raise
+
+    def test_grid_timeseries_invalid_reference_periods(self, api_client):
+        """Test that reserved or repeated names and missing bounds of reference periods are rejected"""
+        logging.info("Running test_grid_timeseries_invalid_reference_periods")
+        try:
+            params = {
+                'dataset': 'spartacus-v2-1y-1km',
+                'variable': 'TM',
+                'layerDate': '2020-01-01 00:00:00',
+                'lat': 47,
+                'lng': 15,
+                'climate': False
+            }
+            invalid_periods = [
+                [{'name': 'overall', 'start': '2011-01-01', 'end': '2020-12-31'}],
+                ['1981_2010', {'name': '1981_2010', 'start': '2011-01-01', 'end': '2020-12-31'}],
+                [{'start': None, 'end': '2020-12-31'}]
+            ]
+            
+            for periods in invalid_periods:
+                response = requests.post(
+                    f"{api_client['base_url']}/gridTimeseries", 
+                    data=json.dumps({**params, 'reference_periods': periods}), 
+                    headers=api_client['headers']
+                )
+                assert response.status_code == 400, f"Expected 400 for {periods}, got {response.status_code}"
+            logging.info("Grid timeseries invalid reference periods test passed")
+        except AssertionError as e:
+            self.log_error("test_grid_timeseries_invalid_reference_periods", str(e))
+            raise
@@ -6,61 +6,61 @@ import time
 import re
 from datetime import datetime
 import numpy as np
-import ast
-import rasterio
 
 import processors
+import cube_store
+import grid_geometry
+import engine_profile
+import raster_stats
+import raster_stats_store
 
 GSA_DATAHUB_ROOT = "/home/shared/CRM/11_gsa_datahub/"
+GSA_POINTCUBE_ROOT = f"{GSA_DATAHUB_ROOT}/pointcubes"
 
+# Extraction engine used for datasets without a point cube store, set with configure_extraction
+EXTRACTION_ENGINES = ('threading', 'process', 'async')
+EXTRACTION_ENGINE = 'threading'
+EXTRACTION_WORKERS = 4
+EXTRACTION_CHUNK_SIZE = 64
 
-def get_raster_stats(raster_path, variable, dataset):
+
+def get_raster_stats(raster_path, variable, dataset, histogram_bins=None, quantiles=None):
     """
-    Extract minimum, maximum, and mean statistics from a raster file.
-    If the variable is "SA", convert the extracted min, max, and mean values 
-    to sunshine hours per day based on the dataset period.
+    Get minimum, maximum, and mean statistics of a raster file.
+
+    The statistics are served from the precomputed raster_stats_store while its
+    entry for the file is current, and otherwise computed block by block from
+    the file with bounded memory (see raster_stats.compute_stats). A histogram
+    or quantiles are not stored and are always computed in that pass.
 
     Parameters:
     raster_path (str): Path to the raster file.
     variable (str): The variable name (e.g., "SA").
     dataset (str): The dataset name (e.g., "spartacus-v2-1d-1km").
+    histogram_bins (int): Optional number of equal-width histogram bins over [min, max].
+    quantiles (list): Optional quantiles in [0, 1] to estimate, e.g. [0.02, 0.98].
 
     Returns:
-    dict: A dictionary containing the minimum, maximum, and mean values of the raster data.
-    """
-    with rasterio.open(raster_path) as src:
-        data = src.read(1)
-
-        if src.nodata is not None:
-            data = data[data != src.nodata]
-
-        min_val = np.nanmin(data)
-        max_val = np.nanmax(data)
-        mean_val = np.nanmean(data)
-
-        # Convert min, max, and mean for "SA" based on the dataset period
-        # if variable == "SA":
-        #     if "1d" in dataset:
-        #         # Convert seconds per day to hours per day
-        #         min_val /= 3600
-        #         max_val /= 3600
-        #         mean_val /= 3600
-        #     elif "1m" in dataset:
-        #         # Convert seconds per month to hours per day (assuming 30 days per month)
-        #         min_val /= (3600 * 30)
-        #         max_val /= (3600 * 30)
-        #         mean_val /= (3600 * 30)
-        #     elif "1y" in dataset:
-        #         # Convert seconds per year to hours per day (assuming 365 days per year)
-        #         min_val /= (3600 * 365)
-        #         max_val /= (3600 * 365)
-        #         mean_val /= (3600 * 365)
-
-        return {
-            'min': min_val,
-            'max': max_val,
-            'mean': mean_val
-        }
+    dict: A dictionary containing the minimum, maximum, and mean values of the raster data,
+    the number of valid pixels and the number of nodata pixels, plus 'histogram' and
+    'quantiles' if requested.
+    """
+    if not histogram_bins and not quantiles:
+        store = raster_stats_store.get_store()
+        if store is not None:
+            stats = store.lookup(raster_path)
+            if stats is not None:
+                return stats
+
+    return raster_stats.compute_stats(raster_path, histogram_bins=histogram_bins, quantiles=quantiles)
+
+
+async def get_raster_stats_async(raster_path, variable, dataset, histogram_bins=None, quantiles=None):
+    """
+    Awaitable variant of get_raster_stats that reads the raster on the async extraction engine.
+    """
+    return await processors.get_async_engine().run_blocking(get_raster_stats, raster_path, variable, dataset,
+                                                            histogram_bins, quantiles)
 
 
 def timeit(func):
@@ -215,15 +215,108 @@ def sort_tuple_array_by_datetime(array: list) -> list:
     return sorted(array, key=lambda x: x[0])
 
 
+def configure_extraction(engine: str = 'threading', workers: int = 4, chunk_size: int = 64, async_workers: int = 8):
+    """
+    Selects the extraction engine used by create_processor.
+
+    Args:
+        engine (str): 'threading' for a thread pool per request, 'process' for the
+            long-lived worker-process engine or 'async' for the bounded async engine.
+        workers (int): Number of threads or worker processes, or the number of
+            concurrent reads per request for the async engine.
+        chunk_size (int): Number of files sent to a worker process at once.
+        async_workers (int): Size of the thread pool shared by all async requests.
+    """
+    global EXTRACTION_ENGINE, EXTRACTION_WORKERS, EXTRACTION_CHUNK_SIZE
+
+    if engine not in EXTRACTION_ENGINES:
+        raise ValueError(f"Extraction engine {engine} not supported! Use one of {EXTRACTION_ENGINES}.")
+    
+    EXTRACTION_ENGINE = engine
+    EXTRACTION_WORKERS = workers
+    EXTRACTION_CHUNK_SIZE = chunk_size
+    processors.get_async_engine(async_workers)
+    # One process pool serves all datasets, sized for the largest calibrated parallelism
+    processors.configure_process_engine(max(workers, engine_profile.max_workers('process')))
+
+
+def create_processor(dataset: str, variable: str, month = None, day = None, engine = None, **file_filter):
+    """
+    Creates the processor serving a dataset/variable: the point cube processor
+    if a store has been built for it, otherwise the engine and parallelism of the
+    dataset's calibrated profile (see engine_profile.py) or the configured engine.
+
+    Args:
+        dataset (str): The name of the dataset directory within the GSA_DATAHUB_ROOT path.
+        variable (str): The name of the variable directory within the dataset directory.
+        month (int, optional): Only use files of this month.
+        day (int, optional): Only use files of this day of month.
+        engine (str, optional): Overrides the configured extraction engine.
+        **file_filter: start/end datetimes and climate_period applied to the file
+            names before any file is opened (see BaseGeoTIFFProcessor).
+
+    Returns:
+        BaseGeoTIFFProcessor: The processor for the dataset directory.
+    """
+    data_dir = f"{GSA_DATAHUB_ROOT}/{dataset}/{variable}"
+    store_dir = cube_store.point_cube_dir(dataset, variable)
+
+    if cube_store.PointCubeStore.exists(store_dir):
+        return processors.GeoTIFFCubeProcessor(data_dir, store_dir, month = month, day = day, **file_filter)
+    
+    # A calibrated profile of the dataset takes precedence over the configured engine
+    profile = engine_profile.lookup(dataset) or {}
+    if engine is not None and profile.get('engine') != engine:
+        profile = {}
+    
+    engine = engine or profile.get('engine', EXTRACTION_ENGINE)
+    workers = profile.get('workers', EXTRACTION_WORKERS)
+    chunk_size = profile.get('chunk_size', EXTRACTION_CHUNK_SIZE)
+    
+    if engine == 'process':
+        return processors.GeoTIFFProcessPoolProcessor(data_dir, month = month, day = day, workers = workers, chunk_size = chunk_size, **file_filter)
+    elif engine == 'async':
+        return processors.AsyncGeoTIFFProcessor(data_dir, month = month, day = day, max_workers = workers, **file_filter)
+    
+    return processors.GeoTIFFThreadingProcessor(data_dir, month = month, day = day, threads = workers, **file_filter)
+
+
+def locate_point_in_dataset(dataset: str, variable: str, lat: float, lng: float):
+    """
+    Resolves a point to the grid cell of a dataset without opening any raster
+    of the time series, using the cached grid geometry of the dataset.
+
+    Args:
+        dataset (str): The name of the dataset directory within the GSA_DATAHUB_ROOT path.
+        variable (str): The name of the variable directory within the dataset directory.
+        lat (float): The latitude coordinate.
+        lng (float): The longitude coordinate.
+
+    Returns:
+        GridCell or None: The (row, col) of the point on the dataset grid, or None
+        if the point is outside the dataset footprint or the directory holds no rasters.
+    """
+    data_dir = f"{GSA_DATAHUB_ROOT}/{dataset}/{variable}"
+    if not os.path.isdir(data_dir):
+        return None
+    
+    geometry = grid_geometry.get_registry().get(data_dir)
+    if geometry is None:
+        return None
+    
+    return geometry.locate(lat, lng)
+
+
 @timeit
-def get_timeseries_from_dataset(dataset: str, variable: str, lat: float, lng: float, month = None, day = None, climate_period = None) -> list:
+def get_timeseries_from_dataset(dataset: str, variable: str, lat: float, lng: float, month = None, day = None, climate_period = None, start = None, end = None) -> list:
     """
     Retrieves a time series of values from a dataset of GeoTIFF files for 
     a specific variable at given latitude and longitude coordinates.
     
     This function processes all GeoTIFF files within a specified dataset 
     and variable directory, extracting values at the specified geographic coordinates.
-    It utilizes multiprocessing to enhance performance during file processing. 
+    It utilizes multiprocessing to enhance performance during file processing,
+    or reads the series from a prebuilt point cube store if one exists. 
     Each file's datetime is extracted from its filename, and results are 
     sorted in chronological order.
     
@@ -232,6 +325,9 @@ def get_timeseries_from_dataset(dataset: str, variable: str, lat: float, lng: fl
         variable (str): The name of the variable directory within the dataset directory.
         lat (float): The latitude coordinate for which to extract the variable values.
         lng (float): The longitude coordinate for which to extract the variable values.
+        climate_period (str, optional): Only use the CLIM files of this period, e.g. '1991_2020'.
+        start (datetime, optional): Only use files from this datetime on.
+        end (datetime, optional): Only use files up to and including this datetime.
    
     Returns:
         list of tuples: A sorted list where each tuple contains a datetime object
@@ -253,14 +349,56 @@ def get_timeseries_from_dataset(dataset: str, variable: str, lat: float, lng: fl
             print(f"{timestamp}: {value}")
     """
     
-    data_dir = f"{GSA_DATAHUB_ROOT}/{dataset}/{variable}"
-
-    processor = processors.GeoTIFFThreadingProcessor(data_dir, month = month, day = day, threads = 4)
+    processor = create_processor(dataset, variable, month = month, day = day, start = start, end = end, climate_period = climate_period)
     results = processor.process_geotiffs('.tif', lat, lng)
     
-    if climate_period is not None:
-        results = [res for res in results if climate_period in res[0]]
+    return _process_timeseries_results(results, dataset, variable, lat, lng)
+
+
+def iter_timeseries_from_dataset(dataset: str, variable: str, lat: float, lng: float, chunk_size: int = 256, month = None, day = None,
+                                 climate_period = None, start = None, end = None):
+    """
+    Streaming variant of get_timeseries_from_dataset.
+    
+    The files are read in chronological chunks of chunk_size files; each chunk is
+    yielded as soon as it has been extracted, so the first values are available
+    before the last file is read and the full series is never held at once.
+    
+    Yields:
+        list of tuples: (datetime, value) tuples of one chunk sorted by datetime.
+        Chunks without any value are skipped.
+    """
+    processor = create_processor(dataset, variable, month = month, day = day, start = start, end = end, climate_period = climate_period)
+    for results in processor.iter_geotiffs('.tif', lat, lng, chunk_size):
+        chunk = [(extract_datetime_from_filename(basename(res[0])), res[1]) for res in results if res is not None]
+        if chunk:
+            yield chunk
+
+
+async def get_timeseries_from_dataset_async(dataset: str, variable: str, lat: float, lng: float, month = None, day = None, climate_period = None, start = None, end = None) -> list:
+    """
+    Awaitable variant of get_timeseries_from_dataset for async views.
+    
+    Files are read on the bounded async extraction engine, so the calling event
+    loop stays free while the rasters are read. Point cube stores are read directly.
     
+    Returns:
+        list of tuples: Same as get_timeseries_from_dataset.
+    """
+    processor = create_processor(dataset, variable, month = month, day = day, engine = 'async', start = start, end = end, climate_period = climate_period)
+    if isinstance(processor, processors.AsyncGeoTIFFProcessor):
+        results = await processor.process_geotiffs_async('.tif', lat, lng)
+    else:
+        results = await processors.get_async_engine().run_blocking(processor.process_geotiffs, '.tif', lat, lng)
+    
+    return _process_timeseries_results(results, dataset, variable, lat, lng)
+
+
+def _process_timeseries_results(results: list, dataset: str, variable: str, lat: float, lng: float) -> list:
+    """
+    Turns the (path, value) results of a processor into a time series sorted by
+    the datetimes extracted from the filenames, or None if no value was found.
+    """
     if not all(res is None for res in results):
         results_processed = [(extract_datetime_from_filename(basename(res[0])),res[1]) for res in results]
         results_processed_sorted = sort_tuple_array_by_datetime(results_processed)
@@ -276,66 +414,277 @@ def get_timeseries_from_dataset(dataset: str, variable: str, lat: float, lng: fl
     return results_processed_sorted
 
 
-def calculate_stats_for_timeseries(df):
+def get_timeseries_for_points(dataset: str, variable: str, lats: list, lngs: list, month = None, day = None, climate_period = None, start = None, end = None) -> list:
+    """
+    Retrieves the time series of many points from a dataset of GeoTIFF files,
+    reading every file only once for all points.
+    
+    The points are transformed with one vectorized call and resolved on the
+    dataset grid; each file is then read once for all points inside the footprint.
+    
+    Args:
+        dataset (str): The name of the dataset directory within the GSA_DATAHUB_ROOT path.
+        variable (str): The name of the variable directory within the dataset directory.
+        lats (list of float): The latitude coordinates of the points.
+        lngs (list of float): The longitude coordinates of the points.
+   
+    Returns:
+        list: One entry per point in input order, either None if the point is outside
+        the dataset footprint or a list of (datetime, value) tuples sorted by datetime.
+    """
+    processor = create_processor(dataset, variable, month = month, day = day, start = start, end = end, climate_period = climate_period)
+    inside, results = processor.process_geotiffs_points('.tif', lats, lngs)
+    
+    results_processed = [(extract_datetime_from_filename(basename(path)), values) for path, values in results]
+    results_processed_sorted = sort_tuple_array_by_datetime(results_processed)
+    
+    timeseries = [None] * len(lats)
+    for k, i in enumerate(np.flatnonzero(inside)):
+        timeseries[i] = [(dt, values[k]) for dt, values in results_processed_sorted]
+    
+    return timeseries
+
+
+def bbox_to_geometry(bbox: list) -> dict:
+    """
+    Converts a bounding box [min_lng, min_lat, max_lng, max_lat] to a GeoJSON polygon.
+    """
+    min_lng, min_lat, max_lng, max_lat = bbox
+    return {
+        'type': 'Polygon',
+        'coordinates': [[(min_lng, min_lat), (max_lng, min_lat), (max_lng, max_lat), (min_lng, max_lat), (min_lng, min_lat)]]
+    }
+
+
+def get_area_timeseries_from_dataset(dataset: str, variable: str, geometry: dict, month = None, day = None, climate_period = None, start = None, end = None) -> list:
+    """
+    Retrieves the area mean, minimum and maximum per time step of a dataset of
+    GeoTIFF files within a polygon.
+    
+    The polygon is rasterized once to a pixel mask on the dataset grid; from every
+    file only the window covering the polygon is read, in parallel threads.
+    
+    Args:
+        dataset (str): The name of the dataset directory within the GSA_DATAHUB_ROOT path.
+        variable (str): The name of the variable directory within the dataset directory.
+        geometry (dict): GeoJSON Polygon or MultiPolygon geometry in WGS84 coordinates.
+   
+    Returns:
+        list of tuples: (datetime, mean, min, max) tuples sorted by datetime, or None
+        if the polygon does not cover any pixel of the dataset.
+    """
+    data_dir = f"{GSA_DATAHUB_ROOT}/{dataset}/{variable}"
+    
+    processor = processors.GeoTIFFThreadingProcessor(data_dir, month = month, day = day, threads = EXTRACTION_WORKERS,
+                                                     start = start, end = end, climate_period = climate_period)
+    results = processor.process_geotiffs_area('.tif', grid_geometry.transform_geometry_to_grid(geometry))
+    results = [res for res in results if res is not None]
+    
+    if not results:
+        print(f"No data found for {dataset}/{variable} within the requested area")
+        return None
+    
+    results_processed = [(extract_datetime_from_filename(basename(path)), mean, min_val, max_val)
+                         for path, mean, min_val, max_val, _ in results]
+    return sort_tuple_array_by_datetime(results_processed)
+
+
+# Default climate reference periods of calculate_stats_for_timeseries as (name, first, last second)
+STATS_REFERENCE_PERIODS = (
+    ('1961_1991', "1961-01-01 00:00:00", "1991-12-31 23:59:59"),
+    ('1991_2020', "1991-01-01 00:00:00", "2020-12-31 23:59:59"),
+)
+MAX_REFERENCE_PERIODS = 50
+
+
+def parse_reference_period(period) -> tuple:
+    """
+    Parses a reference period of a request into a (name, first, last second) tuple.
+    
+    Args:
+        period (str or dict): Either "YYYY_YYYY" for the 1 January of the first to the
+            31 December of the last year (e.g. "1981_2010"), or a user-defined window
+            {"start": date, "end": date, "name": optional str}, both days inclusive.
+    
+    Returns:
+        tuple: (name, first, last) with the bounds as "%Y-%m-%d %H:%M:%S" strings.
+    
+    Raises:
+        ValueError: If the period cannot be parsed, its bounds or name are not strings or it ends before it starts.
+    """
+    if isinstance(period, str):
+        match = re.fullmatch(r"(\d{4})_(\d{4})", period)
+        if match is None:
+            raise ValueError(f"Reference period must be 'YYYY_YYYY' or a start/end object: {period}")
+        start = pd.Timestamp(int(match.group(1)), 1, 1)
+        end = pd.Timestamp(int(match.group(2)), 12, 31, 23, 59, 59)
+        name = period
+    elif isinstance(period, dict) and 'start' in period and 'end' in period:
+        if not isinstance(period['start'], str) or not isinstance(period['end'], str):
+            raise ValueError(f"Reference period start and end must be date strings: {period}")
+        if not isinstance(period.get('name', ''), (str, type(None))):
+            raise ValueError(f"Reference period name must be a string: {period}")
+        start = pd.to_datetime(period['start']).normalize()
+        end = pd.to_datetime(period['end']).normalize() + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+        name = period.get('name') or f"{start:%Y-%m-%d}_{end:%Y-%m-%d}"
+    else:
+        raise ValueError(f"Reference period must be 'YYYY_YYYY' or a start/end object: {period}")
+    
+    if end < start:
+        raise ValueError(f"Reference period {name} ends before it starts")
+    return (name, start.strftime("%Y-%m-%d %H:%M:%S"), end.strftime("%Y-%m-%d %H:%M:%S"))
+
+
+def format_datetimes(datetimes) -> np.ndarray:
+    """
+    Formats a datetime column as "%Y-%m-%d %H:%M:%S" strings; columns that are not datetimes are returned as they are.
+    """
+    datetimes = pd.Series(datetimes)
+    if pd.api.types.is_datetime64_any_dtype(datetimes):
+        return datetimes.dt.strftime("%Y-%m-%d %H:%M:%S").to_numpy(dtype=object)
+    return datetimes.to_numpy(dtype=object)
+
+
+def _epoch_seconds(datetimes) -> np.ndarray:
+    """Converts a datetime (or datetime string) column to int64 epoch seconds."""
+    datetimes = pd.Series(datetimes)
+    if not pd.api.types.is_datetime64_any_dtype(datetimes):
+        datetimes = pd.to_datetime(datetimes)
+    return datetimes.to_numpy(dtype='datetime64[s]').astype(np.int64)
+
+
+def _sort_indices(values: np.ndarray, ascending: bool) -> np.ndarray:
+    """
+    Returns the row order of sort_values on a value column with NaNs last.
+    
+    This is the order pandas' nargsort computes with its default, unstable
+    quicksort, so tied values come out in the same order as with sort_values.
+    """
+    nan_mask = np.isnan(values)
+    non_nans = values[~nan_mask]
+    non_nan_idx = np.flatnonzero(~nan_mask)
+    if not ascending:
+        non_nans = non_nans[::-1]
+        non_nan_idx = non_nan_idx[::-1]
+    indexer = non_nan_idx[non_nans.argsort(kind='quicksort')]
+    if not ascending:
+        indexer = indexer[::-1]
+    return np.concatenate([indexer, np.flatnonzero(nan_mask)])
+
+
+def _top_k_indices(values: np.ndarray, k: int, largest: bool) -> np.ndarray:
+    """
+    Returns the indices of the first k rows of sort_values(ascending=not largest), NaNs last.
+    
+    If the k values selected by argpartition are distinct and none of them is
+    tied with the next value, their order is fixed by the values and only they
+    are sorted. Otherwise the order of the ties depends on the sort algorithm,
+    and the whole column is sorted like sort_values (see _sort_indices).
+    """
+    valid = np.flatnonzero(~np.isnan(values))
+    # float64 keys: negating unsigned integers would wrap around
+    keys = values[valid].astype(np.float64)
+    if largest:
+        keys = -keys
+    n = min(k, len(valid))
+    
+    if n < len(valid):
+        partition = np.argpartition(keys, n)
+        selected, following = partition[:n], keys[partition[n]]
+        tie_free = len(np.unique(keys[selected])) == n and (n == 0 or following > keys[selected].max())
+    else:
+        selected = np.arange(len(valid))
+        tie_free = len(np.unique(keys)) == n
+    
+    if not tie_free:
+        return _sort_indices(values, ascending=not largest)[:k]
+    
+    indices = valid[selected[np.argsort(keys[selected])]]
+    if n < k:
+        indices = np.concatenate([indices, np.flatnonzero(np.isnan(values))[:k - n]])
+    return indices
+
+
+def calculate_stats_for_timeseries(df, reference_periods = STATS_REFERENCE_PERIODS):
     """
     Calculates mean, minimum, and maximum values for the entire 
-    period and for two specific climate reference periods: 
+    period and for climate reference periods, by default 
     1961-1991 and 1991-2020. For min and max, the datetime and 
     value are provided as strings.
+    
+    The statistics are computed on the value array and int64 epoch seconds.
+    All reference periods are resolved to index ranges of the time-sorted
+    series with one searchsorted call; their means come from prefix sums, so
+    the cost hardly grows with the number of periods. top5/bottom5 use
+    argpartition, and only the datetimes of the selected records are formatted.
+    Tied values resolve to the same records as with sort_values and
+    idxmin/idxmax, see _top_k_indices.
 
     Args:
         data (list of tuples): A list where each tuple contains a
         datetime object and a numeric value.
+        reference_periods (list of tuples): (name, first, last) tuples with the bounds
+            as "%Y-%m-%d %H:%M:%S" strings, see parse_reference_period.
 
     Returns:
         dict: A dictionary containing the overall mean, min, max, 
         and the mean, min, max for each reference period, with datetimes
-        formatted as strings.
+        formatted as strings. Periods without values have a NaN mean and
+        None as min and max.
     """
+    values = df['value'].to_numpy()
+    seconds = _epoch_seconds(df['datetime'])
+    datetimes = df['datetime']
+    is_datetime = pd.api.types.is_datetime64_any_dtype(datetimes)
+    
+    def format_date(i):
+        return datetimes.iloc[i].strftime("%Y-%m-%d %H:%M:%S") if is_datetime else datetimes.iloc[i]
+    
+    def extremes(period_values, indices):
+        if np.isnan(period_values).all():
+            return None, None
+        # Like idxmin/idxmax: the first row in input order, also if the period was taken from the time-sorted series
+        i_min = indices[period_values == np.nanmin(period_values)].min()
+        i_max = indices[period_values == np.nanmax(period_values)].min()
+        return ({'date': format_date(i_min), 'value': values[i_min]},
+                {'date': format_date(i_max), 'value': values[i_max]})
 
-    # Convert datetime to string
-    if pd.api.types.is_datetime64_any_dtype(df['datetime']):
-        df['datetime'] = df['datetime'].apply(lambda x: x.strftime("%Y-%m-%d %H:%M:%S"))
-        
     # Calculate overall statistics
-    overall_mean = df['value'].mean()
-    overall_min = df.loc[df['value'].idxmin()].values.tolist()
-    overall_max = df.loc[df['value'].idxmax()].values.tolist()
-    overall_top5 = df.sort_values(by='value', ascending=False)[:5] 
-    overall_bottom5 = df.sort_values(by='value', ascending=True)[:5] 
-
-    # Define the climate reference periods
-    period1_start = "1961-01-01 00:00:00"
-    period1_end = "1991-12-31 23:59:59"
-    period2_start = "1991-01-01 00:00:00"
-    period2_end = "2020-12-31 23:59:59"
-
-    # Calculate statistics for the first climate reference period
-    period1_df = df[(df['datetime'] >= period1_start) & (df['datetime'] <= period1_end)]
-    period1_mean = period1_df['value'].mean()
-    period1_min = period1_df.loc[period1_df['value'].idxmin()].values.tolist()
-    period1_max = period1_df.loc[period1_df['value'].idxmax()].values.tolist()
-
-    # Calculate statistics for the second climate reference period
-    period2_df = df[(df['datetime'] >= period2_start) & (df['datetime'] <= period2_end)]
-    period2_mean = period2_df['value'].mean()
-    period2_min = period2_df.loc[period2_df['value'].idxmin()].values.tolist()
-    period2_max = period2_df.loc[period2_df['value'].idxmax()].values.tolist()
-
-    # Format results
-    format_result = lambda result: {'date': result[0], 'value': result[1]}
-
-    # Return the statistics as a dictionary
-    return {
-        'current_location_stats': {
-            'overall': {'mean': overall_mean, 'min': format_result(overall_min), 'max': format_result(overall_max),
-                        'top5': {'date': list(overall_top5['datetime'].values), 'value': list(overall_top5['value'].values)}, 
-                        'bottom5': {'date': list(overall_bottom5['datetime'].values), 'value': list(overall_bottom5['value'].values)}
-                        },
-            '1961_1991': {'mean': period1_mean, 'min': format_result(period1_min), 'max': format_result(period1_max)},
-            '1991_2020': {'mean': period2_mean, 'min': format_result(period2_min), 'max': format_result(period2_max)}
-        }
+    overall_min, overall_max = extremes(values, np.arange(len(values)))
+    top5 = _top_k_indices(values, 5, largest=True)
+    bottom5 = _top_k_indices(values, 5, largest=False)
+    
+    stats = {
+        'overall': {'mean': pd.Series(values).mean(), 'min': overall_min, 'max': overall_max,
+                    'top5': {'date': [format_date(i) for i in top5], 'value': list(values[top5])},
+                    'bottom5': {'date': [format_date(i) for i in bottom5], 'value': list(values[bottom5])}
+                    }
     }
+    
+    if not reference_periods:
+        return {'current_location_stats': stats}
+    
+    # Resolve all reference periods to index ranges of the time-sorted series at once
+    order = np.arange(len(values)) if np.all(seconds[1:] >= seconds[:-1]) else np.argsort(seconds, kind='stable')
+    sorted_seconds, sorted_values = seconds[order], values[order]
+    bounds = np.array([(np.datetime64(start, 's'), np.datetime64(end, 's')) for _, start, end in reference_periods]).astype(np.int64)
+    starts = np.searchsorted(sorted_seconds, bounds[:, 0], side='left')
+    ends = np.searchsorted(sorted_seconds, bounds[:, 1], side='right')
+    
+    valid = ~np.isnan(sorted_values)
+    # Like Series.mean: float series keep their dtype, integer series get float64 means
+    mean_type = values.dtype.type if values.dtype.kind == 'f' else np.float64
+    value_sums = np.concatenate([[0.0], np.cumsum(np.where(valid, sorted_values, 0), dtype=np.float64)])
+    value_counts = np.concatenate([[0], np.cumsum(valid)])
+    
+    # Calculate statistics for the climate reference periods
+    for (name, _, _), start, end in zip(reference_periods, starts, ends):
+        count = value_counts[end] - value_counts[start]
+        mean = mean_type((value_sums[end] - value_sums[start]) / count) if count else np.nan
+        period_min, period_max = extremes(sorted_values[start:end], order[start:end])
+        stats[name] = {'mean': mean, 'min': period_min, 'max': period_max}
+
+    return {'current_location_stats': stats}
 
 
 def convert_timeseries_tuple_to_dict(data):
@@ -360,20 +709,20 @@ def convert_timeseries_tuple_to_dict(data):
     return {'dates': dates, 'values': values}
 
 
-def create_timeseries_object(timeseries):
+def create_timeseries_object(timeseries, reference_periods = STATS_REFERENCE_PERIODS):
     
-    timeseries_stats = calculate_stats_for_timeseries(timeseries)
+    timeseries_stats = calculate_stats_for_timeseries(timeseries, reference_periods)
     timeseries_values = {
-        'dates': list(timeseries['datetime'].values),
-        'values': list(timeseries['value'].values)
+        'dates': list(format_datetimes(timeseries['datetime'])),
+        'values': timeseries['value'].values
     }
     
     for suffix in ['full', 'valley', 'mountain']:
         for key in [f'idr_{suffix}', f'iqr_{suffix}', f'minmax_{suffix}']:
             timeseries_stats[key] = {
-                'min': list([ast.literal_eval(val)[0] for val in timeseries[key].values]),
-                'max': list([ast.literal_eval(val)[1] for val in timeseries[key].values]),
-                'mean': np.mean([ast.literal_eval(val)[0] for val in timeseries[key].values])
+                'min': timeseries[f'{key}_lo'].values,
+                'max': timeseries[f'{key}_hi'].values,
+                'mean': np.mean(timeseries[f'{key}_lo'].values)
             }
 
     obj = {